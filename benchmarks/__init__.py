@@ -0,0 +1,3 @@
+"""
+Benchmarks de Popcorn Quiz contra un servidor local que imita a TMDb, sin red ni usuario.
+"""
@@ -0,0 +1,274 @@
+# Benchmarks de las etapas del juego contra el servidor local que imita a TMDb
+
+import argparse
+import builtins
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image
+
+from benchmarks.tmdb_stub import StubServer
+from popcorn import config
+from popcorn.cache import DetailsCache
+from popcorn.display import PosterDisplay
+from popcorn.eligibility import QUESTION_TYPES
+from popcorn.export_store import ExportStore
+from popcorn.movies import get_movie_details, obtain_movie_pool
+from popcorn.posters import PosterService
+from popcorn.questions import (build_question, get_poster_part, question_details, question_overview,
+                               question_poster_piece, question_release_date)
+from popcorn.sampling import SamplingEngine
+from popcorn.tmdb import TMDbClient
+
+# Longitud de las filas de texto, la misma que usa el juego
+LINE_WIDTH = 80
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Márgenes absolutos que se suman a la tolerancia relativa para no fallar por ruido en etapas muy cortas
+WALL_SLACK = 0.05                     # segundos
+MEMORY_SLACK = 0.5                    # MB
+REQUESTS_SLACK = 2
+
+
+
+class Recorder:
+
+    """
+    Mide cada etapa del juego: tiempo de reloj, pico de memoria (tracemalloc) y peticiones
+    recibidas por el servidor local.
+
+    Args:
+        stub (benchmarks.tmdb_stub.StubServer): El servidor local que imita a TMDb.
+    """
+
+    def __init__(self, stub):
+        self.stub = stub
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        before = self.stub.snapshot()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            after = self.stub.snapshot()
+            self.results[name] = {
+                "wall_s": round(wall, 4),
+                "peak_mb": round(peak / 1024**2, 3),
+                "requests": sum(after.get(k, 0) - before.get(k, 0) for k in ("export", "movie", "poster")),
+                "errors": after.get("error", 0) - before.get("error", 0)
+            }
+
+
+
+@contextlib.contextmanager
+def non_interactive():
+
+    """
+    Permite ejecutar las preguntas sin usuario: responde siempre "1", no abre el visor de
+    imágenes y descarta lo que se imprime por pantalla.
+    """
+
+    original_input, original_show = builtins.input, Image.Image.show
+    builtins.input = lambda prompt="": "1"
+    Image.Image.show = lambda self, *args, **kwargs: None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input, Image.Image.show = original_input, original_show
+
+
+
+def run(stub, workdir, difficulties, repeat):
+
+    """
+    Recorre las etapas del juego para cada dificultad y mide cada una.
+
+    Args:
+        stub (benchmarks.tmdb_stub.StubServer): El servidor local que imita a TMDb.
+        workdir (str): Directorio temporal para las cachés.
+        difficulties (list): Las dificultades a medir.
+        repeat (int): Número de preguntas que se generan por tipo y dificultad.
+
+    Returns:
+        dict: Las medidas de cada etapa.
+    """
+
+    recorder = Recorder(stub)
+    export_date = dt.date.today() - dt.timedelta(days=7)
+    sampling = SamplingEngine(0)
+
+    # Cargar ya los plugins de Pillow para que su coste no caiga en la primera etapa que abre una imagen
+    Image.init()
+
+    # Export diario: descarga, lectura y construcción del índice; después, reutilización del índice guardado
+    export_store = ExportStore(os.path.join(workdir, "exports"))
+    with non_interactive(), recorder.stage("export/cold"):
+        export_store.popularity_index(export_date)
+    with non_interactive(), recorder.stage("export/warm"):
+        ExportStore(os.path.join(workdir, "exports")).popularity_index(export_date)
+
+    # Detalles de películas sueltas, sin caché
+    with TMDbClient("benchmark") as tmdb_client, non_interactive(), recorder.stage("details/get_movie_details"):
+        for movie_id in range(1, 21):
+            get_movie_details(movie_id, tmdb_client)
+
+    # Preparar una partida sin medirla, para que los costes de la primera vez (imports, cachés internas)
+    # no caigan en la primera dificultad medida
+    with TMDbClient("benchmark", cache=DetailsCache(os.path.join(workdir, "warmup.sqlite3"))) as tmdb_client, non_interactive():
+        obtain_movie_pool(export_date, difficulties[0], tmdb_client, export_store, rng=sampling.stream("warmup"))
+
+    cache = DetailsCache(os.path.join(workdir, "details.sqlite3"))
+    with TMDbClient("benchmark", cache=cache) as tmdb_client:
+        for dificulty in difficulties:
+            prefix = f"d{dificulty}"
+
+            # Películas de la partida con la caché vacía y de una segunda partida que reutiliza la caché
+            with non_interactive(), recorder.stage(f"{prefix}/obtain_movie_pool/cold"):
+                movie_pool, eligibility = obtain_movie_pool(export_date, dificulty, tmdb_client, export_store, rng=sampling.stream(f"pool:{dificulty}"))
+            with non_interactive(), recorder.stage(f"{prefix}/obtain_movie_pool/second_game"):
+                obtain_movie_pool(export_date, dificulty, tmdb_client, export_store, rng=sampling.stream(f"second_game:{dificulty}"))
+
+            # Generación de cada tipo de pregunta
+            questions = {}
+            for question_type in QUESTION_TYPES:
+                with recorder.stage(f"{prefix}/build_{question_type}"):
+                    for _ in range(repeat):
+                        questions[question_type] = build_question(question_type, movie_pool, eligibility, dificulty, LINE_WIDTH, rng=sampling.stream(f"{question_type}:{dificulty}"))
+
+            # Presentación de cada pregunta y validación de la respuesta (con el visor de imágenes
+            # desactivado, para medir lo mismo en cualquier terminal)
+            display = PosterDisplay("viewer")
+            poster_service = PosterService(os.path.join(workdir, f"posters-{dificulty}"))
+            with non_interactive():
+                with recorder.stage(f"{prefix}/question_release_date"):
+                    question_release_date(questions["release_date"])
+                with recorder.stage(f"{prefix}/question_overview"):
+                    question_overview(questions["overview"])
+                with recorder.stage(f"{prefix}/question_details"):
+                    question_details(questions["details"])
+                with recorder.stage(f"{prefix}/question_poster_piece"):
+                    question_poster_piece(questions["poster_piece"], poster_service, display)
+
+            # Recorte de pósters sin caché y con los pósters ya en memoria
+            poster_urls = [movie_pool.poster_urls[position] for position in eligibility.candidates["poster_piece"][:10]]
+            poster_service = PosterService(os.path.join(workdir, f"posters-{dificulty}-crop"))
+            with non_interactive():
+                with recorder.stage(f"{prefix}/get_poster_part/cold"):
+                    for url in poster_urls:
+                        get_poster_part(poster_service, url, dificulty, display)
+                with recorder.stage(f"{prefix}/get_poster_part/warm"):
+                    for url in poster_urls:
+                        get_poster_part(poster_service, url, dificulty, display)
+    cache.close()
+
+    return recorder.results
+
+
+
+def compare(results, baseline, tolerance):
+
+    """
+    Compara las medidas con las de referencia.
+
+    Args:
+        results (dict): Las medidas de cada etapa.
+        baseline (dict): Las medidas de referencia de cada etapa.
+        tolerance (float): Factor máximo admitido sobre la referencia (1.5 admite un 50 % más).
+
+    Returns:
+        list: Las regresiones encontradas, como texto.
+    """
+
+    regressions = []
+    limits = {"wall_s": WALL_SLACK, "peak_mb": MEMORY_SLACK, "requests": REQUESTS_SLACK}
+    for stage, reference in baseline.items():
+        if stage not in results:
+            continue
+        for metric, slack in limits.items():
+            limit = reference[metric] * tolerance + slack
+            if results[stage][metric] > limit:
+                regressions.append(f"{stage}: {metric} = {results[stage][metric]} (referencia {reference[metric]}, límite {limit:.3f})")
+
+    return regressions
+
+
+
+def print_report(results, baseline):
+
+    """
+    Imprime una tabla con las medidas de cada etapa y su referencia.
+    """
+
+    print(f"{'Etapa':<38}{'Tiempo (s)':>12}{'Memoria (MB)':>14}{'Peticiones':>12}{'Errores':>9}{'Ref. (s)':>10}")
+    for stage, result in results.items():
+        reference = baseline.get(stage, {}).get("wall_s", "")
+        print(f"{stage:<38}{result['wall_s']:>12.4f}{result['peak_mb']:>14.3f}{result['requests']:>12}{result['errors']:>9}{reference:>10}")
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmarks de Popcorn Quiz sin conexión.")
+    parser.add_argument("--movies", type=int, default=100000, help="Número de películas del export sintético.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia añadida a cada petición, en segundos.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de que una petición falle con 429/503.")
+    parser.add_argument("--difficulty", type=int, action="append", help="Dificultad a medir (por defecto, todas).")
+    parser.add_argument("--repeat", type=int, default=200, help="Preguntas generadas por tipo y dificultad.")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Factor máximo admitido sobre la referencia.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichero con las medidas de referencia.")
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar estas medidas como referencia.")
+    parser.add_argument("--json", help="Guardar las medidas en este fichero.")
+    args = parser.parse_args()
+
+    difficulties = args.difficulty or sorted(config.difficulty_bands)
+    settings = {"movies": args.movies, "latency": args.latency, "error_rate": args.error_rate, "repeat": args.repeat}
+
+    # Apuntar el juego al servidor local y medir con cachés vacías
+    with StubServer(args.movies, args.latency, args.error_rate) as stub, tempfile.TemporaryDirectory() as workdir:
+        config.tmdb_api_url = f"{stub.base_url}/3"
+        config.tmdb_image_url = f"{stub.base_url}/t/p"
+        config.tmdb_export_url = f"{stub.base_url}/p/exports/movie_ids_{{month}}_{{day}}_{{year}}.json.gz"
+        results = run(stub, workdir, difficulties, args.repeat)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+            f.write("\n")
+        print_report(results, {})
+        print(f"\nReferencia guardada en {args.baseline}.")
+        sys.exit(0)
+
+    # Comparar con la referencia guardada y fallar si alguna etapa ha empeorado
+    baseline = {"settings": settings, "results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline["results"])
+    if baseline["settings"] != settings:
+        print(f"\nAviso: la referencia se midió con otros parámetros ({baseline['settings']}).")
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print("\nRegresiones respecto a la referencia:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\nSin regresiones respecto a la referencia.")
@@ -0,0 +1,105 @@
+# Benchmark del arranque en frío del juego: tiempo hasta la primera pregunta al usuario
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Popcorn quiz.py")
+FIRST_PROMPT = "¿Cómo te llamas?".encode("utf-8")
+
+# Módulos pesados que no deberían importarse en el hilo principal antes de la bienvenida
+HEAVY_MODULES = ["numpy", "pandas", "PIL", "requests", "urllib.request"]
+
+
+
+def measure(script=SCRIPT_PATH, python=sys.executable):
+
+    """
+    Arranca el juego con python -X importtime y mide el tiempo hasta que muestra la primera pregunta.
+
+    Args:
+        script (str): La ruta del script del juego.
+        python (str): El intérprete con el que arrancar el juego.
+
+    Returns:
+        tuple: Los segundos hasta la primera pregunta y las líneas de -X importtime emitidas hasta entonces.
+    """
+
+    env = {**os.environ, "PYTHONIOENCODING": "utf-8", "TERM": os.environ.get("TERM", "dumb")}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [python, "-X", "importtime", script], cwd=os.path.dirname(SCRIPT_PATH), env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+    # Leer la salida hasta que aparece la primera pregunta y cortar el juego ahí
+    output = b""
+    while FIRST_PROMPT not in output:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            break
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.kill()
+    _, stderr = process.communicate()
+    if FIRST_PROMPT not in output:
+        raise RuntimeError(f"El juego terminó sin mostrar la primera pregunta:\n{stderr.decode('utf-8', 'replace')}")
+
+    return elapsed, stderr.decode("utf-8", "replace").splitlines()
+
+
+
+def parse_importtime(lines):
+
+    """
+    Lee las líneas de -X importtime.
+
+    Args:
+        lines (list): Las líneas emitidas por el intérprete.
+
+    Returns:
+        dict: El tiempo acumulado (en segundos) de cada módulo importado.
+    """
+
+    modules = {}
+    for line in lines:
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+
+    return modules
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de Popcorn Quiz hasta la primera pregunta.")
+    parser.add_argument("--script", default=SCRIPT_PATH, help="Script del juego a medir (para comparar versiones).")
+    parser.add_argument("--runs", type=int, default=5, help="Número de arranques a medir.")
+    parser.add_argument("--top", type=int, default=10, help="Número de módulos más lentos a mostrar.")
+    parser.add_argument("--max-ms", type=float, help="Fallar si la mediana supera estos milisegundos.")
+    args = parser.parse_args()
+
+    # Descartar el primer arranque, que compila los .pyc
+    measure(args.script)
+    timings = []
+    for _ in range(args.runs):
+        elapsed, lines = measure(args.script)
+        timings.append(elapsed)
+    modules = parse_importtime(lines)
+
+    median = statistics.median(timings) * 1000
+    print(f"Tiempo hasta la primera pregunta: mediana {median:.1f} ms (mín. {min(timings) * 1000:.1f} ms, máx. {max(timings) * 1000:.1f} ms, {args.runs} arranques)")
+    print("\nMódulos más lentos importados hasta la primera pregunta:")
+    for module, seconds in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {module}")
+    heavy = [module for module in HEAVY_MODULES if module in modules]
+    print(f"\nMódulos pesados ya importados al mostrar la primera pregunta: {', '.join(heavy) or 'ninguno'}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"\nEl arranque supera el límite de {args.max_ms:.0f} ms.")
+        sys.exit(1)
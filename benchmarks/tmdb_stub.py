@@ -0,0 +1,291 @@
+# Servidor HTTP local que imita a TMDb para los benchmarks
+
+import argparse
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+GENRES = ["Acción", "Aventura", "Animación", "Comedia", "Crimen", "Documental", "Drama", "Familia",
+          "Fantasía", "Historia", "Terror", "Música", "Misterio", "Romance", "Ciencia ficción", "Suspense"]
+WORDS = ["una", "familia", "viaje", "ciudad", "secreto", "amor", "guerra", "misión", "último", "pequeño",
+         "joven", "detective", "extraño", "mundo", "noche", "verano", "héroe", "equipo", "pasado", "futuro"]
+
+# Traducciones que devuelve append_to_response=translations: (idioma, región, nombre, prefijo del título)
+TRANSLATIONS = [("en", "US", "English", "Movie"), ("fr", "FR", "Français", "Film"), ("de", "DE", "Deutsch", "Film")]
+
+
+
+def synthetic_movie(movie_id):
+
+    """
+    Genera de forma determinista los detalles de una película con el formato de /3/movie/{id}.
+
+    Args:
+        movie_id (int): El ID de la película.
+
+    Returns:
+        dict: Los detalles de la película. Una parte de las películas no tiene datos económicos,
+              fecha, resumen o póster, como pasa con las menos populares de TMDb.
+    """
+
+    rng = random.Random(movie_id)
+    has_financials = rng.random() < 0.6
+    overview = " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 60))).capitalize() + "."
+
+    return {
+        "id": movie_id,
+        "title": f"Película {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "genres": [{"id": i, "name": name} for i, name in enumerate(rng.sample(GENRES, rng.randint(0, 3)))],
+        "origin_country": [rng.choice(["US", "US", "US", "GB", "ES", "FR", "JP"])],
+        "overview": overview if rng.random() < 0.95 else "",
+        "release_date": f"{rng.randint(1930, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.95 else "",
+        "budget": rng.randint(10**5, 3 * 10**8) if has_financials else 0,
+        "revenue": rng.randint(10**5, 2 * 10**9) if has_financials else 0,
+        "runtime": rng.randint(70, 200) if rng.random() < 0.97 else 0,
+        "poster_path": f"/poster{movie_id}.jpg" if rng.random() < 0.95 else None,
+        "popularity": 1000 / movie_id
+    }
+
+
+
+def synthetic_translations(movie_id):
+
+    """
+    Genera de forma determinista las traducciones de una película con el formato de
+    append_to_response=translations.
+
+    Args:
+        movie_id (int): El ID de la película.
+
+    Returns:
+        dict: Las traducciones, con el título y el resumen de cada idioma (vacíos en algunas
+              películas, como pasa en TMDb con las que no están traducidas).
+    """
+
+    rng = random.Random(-movie_id)
+    translations = []
+    for language, region, name, prefix in TRANSLATIONS:
+        overview = " ".join(f"{language}-{rng.choice(WORDS)}" for _ in range(rng.randint(25, 60))).capitalize() + "."
+        translations.append({
+            "iso_3166_1": region,
+            "iso_639_1": language,
+            "name": name,
+            "english_name": name,
+            "data": {
+                "title": f"{prefix} {movie_id}" if rng.random() < 0.8 else "",
+                "overview": overview if rng.random() < 0.9 else "",
+                "homepage": "",
+                "tagline": "",
+                "runtime": 0
+            }
+        })
+
+    return {"translations": translations}
+
+
+
+def synthetic_export(movies, seed=0):
+
+    """
+    Genera un export diario de IDs comprimido con gzip, con el formato de movie_ids_MM_DD_YYYY.json.gz.
+
+    Args:
+        movies (int): Número de películas del export.
+        seed (int): Semilla del orden de las películas.
+
+    Returns:
+        bytes: El export comprimido.
+    """
+
+    movie_ids = list(range(1, movies + 1))
+    random.Random(seed).shuffle(movie_ids)
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6) as gz:
+        for movie_id in movie_ids:
+            line = {"adult": False, "id": movie_id, "original_title": f"Movie {movie_id}",
+                    "popularity": round(1000 / movie_id, 6), "video": False}
+            gz.write((json.dumps(line) + "\n").encode("utf-8"))
+
+    return buffer.getvalue()
+
+
+
+@lru_cache(maxsize=256)
+def synthetic_poster(movie_id, width=500, height=750):
+
+    """
+    Genera un póster JPEG con un degradado determinista.
+
+    Args:
+        movie_id (int): El ID de la película.
+        width (int): El ancho del póster.
+        height (int): El alto del póster.
+
+    Returns:
+        bytes: El póster en formato JPEG.
+    """
+
+    rng = random.Random(movie_id)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img = Image.blend(img, Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3))), 0.5)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+
+    return buffer.getvalue()
+
+
+
+class StubServer:
+
+    """
+    Servidor local con los tres recursos de TMDb que usa el juego: el export diario de IDs, los
+    detalles de cada película y los pósters, con latencia y tasa de errores configurables.
+
+    Args:
+        movies (int): Número de películas del export.
+        latency (float): Segundos de espera añadidos a cada petición.
+        error_rate (float): Probabilidad de que una petición a la API (detalles) falle con un 429/503;
+                            como en TMDb, el export y los pósters no tienen límite de peticiones.
+        seed (int): Semilla de los datos sintéticos y de los errores.
+        port (int): Puerto en el que escuchar (0 para uno libre).
+    """
+
+    def __init__(self, movies=100000, latency=0.0, error_rate=0.0, seed=0, port=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.export = synthetic_export(movies, seed)
+        self.counts = Counter()
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def snapshot(self):
+
+        """
+        Devuelve los contadores de peticiones por recurso y de bytes enviados.
+
+        Returns:
+            dict: Número de peticiones de cada recurso ("export", "movie", "poster", "error") y bytes enviados.
+        """
+
+        with self.lock:
+            return {**self.counts, "bytes": self.bytes_sent}
+
+    def should_fail(self):
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b"", content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with stub.lock:
+                    stub.bytes_sent += len(body)
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                path = self.path.split("?")[0]
+
+                if re.fullmatch(r"/p/exports/movie_ids_\d{2}_\d{2}_\d{4}\.json\.gz", path):
+                    resource = "export"
+                elif re.fullmatch(r"/3/movie/\d+", path):
+                    resource = "movie"
+                elif re.fullmatch(r"/t/p/\w+/poster\d+\.jpg", path):
+                    resource = "poster"
+                else:
+                    return self.send(404, b'{"status_code": 34}')
+
+                with stub.lock:
+                    stub.counts[resource] += 1
+
+                # Simular la limitación de peticiones y las caídas puntuales de la API
+                if resource == "movie" and stub.should_fail():
+                    with stub.lock:
+                        stub.counts["error"] += 1
+                    if stub.rng.random() < 0.5:
+                        return self.send(429, b'{"status_code": 25}', headers={"Retry-After": "0"})
+                    return self.send(503, b'{"status_code": 11}')
+
+                if resource == "export":
+                    if self.headers.get("If-None-Match") == '"export"':
+                        return self.send(304)
+                    return self.send(200, stub.export, "application/octet-stream", {"ETag": '"export"'})
+                if resource == "movie":
+                    movie_id = int(path.rsplit("/", 1)[1])
+                    movie = synthetic_movie(movie_id)
+                    if "translations" in parse_qs(urlsplit(self.path).query).get("append_to_response", [""])[0].split(","):
+                        movie["translations"] = synthetic_translations(movie_id)
+                    return self.send(200, json.dumps(movie).encode("utf-8"))
+                movie_id = int(re.search(r"poster(\d+)", path).group(1))
+                return self.send(200, synthetic_poster(movie_id), "image/jpeg")
+
+        return Handler
+
+
+
+if __name__ == "__main__":
+
+    # Levantar el servidor para probar el juego completo sin conexión
+    parser = argparse.ArgumentParser(description="Servidor local que imita a TMDb.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--movies", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubServer(args.movies, args.latency, args.error_rate, port=args.port)
+    print(f"TMDB_API_URL={stub.base_url}/3")
+    print(f"TMDB_IMAGE_URL={stub.base_url}/t/p")
+    print(f"TMDB_EXPORT_URL={stub.base_url}/p/exports/movie_ids_{{month}}_{{day}}_{{year}}.json.gz")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,6 @@
+"""
+Módulos de apoyo de Popcorn Quiz.
+
+El juego se lanza desde "Popcorn quiz.py"; este paquete agrupa la descarga y el procesado
+de los datos de The Movie Database (TMDb) que necesita el juego.
+"""
@@ -0,0 +1,234 @@
+# Caché persistente en disco (SQLite) de los registros compactos de películas de TMDb
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+if __name__ == "__main__":
+    # Cargar las variables de entorno desde el archivo .env (antes de leer la configuración)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from popcorn import config, telemetry
+
+
+
+class DetailsCache:
+
+    """
+    Caché en SQLite de los registros compactos de películas (ver popcorn.records), indexada sólo
+    por ID de TMDb: cada registro guarda juntos el título y el resumen de todos sus idiomas, así que
+    una misma entrada sirve para partidas en cualquiera de ellos.
+
+    Las entradas más antiguas que el TTL se consideran caducadas y se vuelven a pedir a la API,
+    y cuando se supera el número máximo de entradas se expulsan las menos usadas recientemente.
+
+    Args:
+        path (str): La ruta del fichero SQLite.
+        ttl (float): Segundos durante los que una entrada se considera vigente.
+        max_entries (int): Número máximo de entradas guardadas.
+    """
+
+    def __init__(self, path=None, ttl=config.details_cache_ttl, max_entries=config.details_cache_max_entries):
+        if path is None:
+            path = os.path.join(config.cache_dir, "details.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        # Una única conexión compartida entre hilos y protegida por el lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+
+            # Las versiones anteriores guardaban la respuesta completa de la API por idioma
+            self.connection.execute("DROP TABLE IF EXISTS movie_details")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS movie_records ("
+                "movie_id INTEGER PRIMARY KEY, payload TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS movie_records_accessed_at ON movie_records (accessed_at)"
+            )
+
+    def close(self):
+
+        """
+        Cierra la conexión con el fichero SQLite.
+
+        Returns:
+            None
+        """
+
+        with self.lock:
+            self.connection.close()
+
+    def get_many(self, movie_ids, languages=()):
+
+        """
+        Busca en la caché los registros vigentes de un lote de películas.
+
+        Args:
+            movie_ids (iterable): Los IDs de las películas en TMDb.
+            languages (iterable): Los idiomas que debe incluir cada registro.
+
+        Returns:
+            dict: Los registros encontrados, indexados por ID de película. Los IDs ausentes,
+                  caducados o sin alguno de los idiomas no aparecen y se cuentan como fallos.
+        """
+
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        languages = set(languages)
+        now = time.time()
+        found = {}
+
+        with self.lock:
+            # Consultar por bloques para no superar el límite de parámetros de SQLite
+            for i in range(0, len(movie_ids), 500):
+                chunk = movie_ids[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT movie_id, payload FROM movie_records "
+                    f"WHERE fetched_at >= ? AND movie_id IN ({placeholders})",
+                    [now - self.ttl, *chunk]
+                )
+                for movie_id, payload in rows:
+                    record = json.loads(payload)
+                    if languages.issubset(record.get("languages", ())):
+                        found[movie_id] = record
+
+            # Marcar los aciertos como usados recientemente para la política de expulsión
+            if found:
+                with self.connection:
+                    self.connection.executemany(
+                        "UPDATE movie_records SET accessed_at = ? WHERE movie_id = ?",
+                        [(now, movie_id) for movie_id in found]
+                    )
+            self.hits += len(found)
+            self.misses += len(set(movie_ids)) - len(found)
+        telemetry.count("cache_lookups", len(found), cache="details", result="hit")
+        telemetry.count("cache_lookups", len(set(movie_ids)) - len(found), cache="details", result="miss")
+
+        return found
+
+    def put_many(self, movies):
+
+        """
+        Guarda en la caché los registros de un lote de películas y expulsa las entradas menos
+        usadas si se supera el tamaño máximo.
+
+        Args:
+            movies (list): Los registros compactos de cada película.
+
+        Returns:
+            None
+        """
+
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO movie_records (movie_id, payload, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(int(movie["id"]), json.dumps(movie, ensure_ascii=False), now, now) for movie in movies]
+            )
+            excess = self.connection.execute("SELECT COUNT(*) FROM movie_records").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM movie_records WHERE rowid IN "
+                    "(SELECT rowid FROM movie_records ORDER BY accessed_at LIMIT ?)",
+                    (excess,)
+                )
+
+    def delete_many(self, movie_ids):
+
+        """
+        Borra de la caché los registros de un lote de películas.
+
+        Args:
+            movie_ids (iterable): Los IDs de las películas en TMDb.
+
+        Returns:
+            list: Los registros borrados, para poder invalidar también lo que depende de ellos (pósters).
+        """
+
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        deleted = []
+
+        with self.lock, self.connection:
+            for i in range(0, len(movie_ids), 500):
+                chunk = movie_ids[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self.connection.execute(
+                    f"SELECT payload FROM movie_records WHERE movie_id IN ({placeholders})", chunk
+                )
+                deleted.extend(json.loads(payload) for payload, in rows)
+                self.connection.execute(f"DELETE FROM movie_records WHERE movie_id IN ({placeholders})", chunk)
+
+        return deleted
+
+    def stats(self):
+
+        """
+        Devuelve los contadores de aciertos y fallos de la caché.
+
+        Returns:
+            dict: El número de aciertos ("hits"), fallos ("misses") y entradas guardadas ("entries").
+        """
+
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM movie_records").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+
+def prewarm(client, ranked_ids, bands=None):
+
+    """
+    Precarga en la caché los detalles de todas las películas de los tramos de popularidad de
+    cada dificultad, de modo que las partidas siguientes no tengan que llamar a la API.
+
+    Args:
+        client (popcorn.tmdb.TMDbClient): Un cliente de TMDb configurado con una caché.
+        ranked_ids (sequence): Los IDs de las películas ordenados de más a menos populares.
+        bands (dict): Los tramos (inicio, fin) de cada dificultad. Por defecto, los de la configuración.
+
+    Returns:
+        dict: Los contadores de la caché al terminar la precarga.
+    """
+
+    if bands is None:
+        bands = config.difficulty_bands
+
+    # Descargar sólo una vez las películas que aparecen en varios tramos
+    movie_ids = []
+    seen = set()
+    for dificulty, (start, end) in sorted(bands.items()):
+        for movie_id in ranked_ids[start:end]:
+            movie_id = int(movie_id)
+            if movie_id not in seen:
+                seen.add(movie_id)
+                movie_ids.append(movie_id)
+        print(f"Precargando la dificultad {dificulty}: películas {start}-{end} del ranking de popularidad.")
+
+    client.get_movies(movie_ids)
+
+    return client.cache.stats()
+
+
+
+if __name__ == "__main__":
+
+    # Precargar la caché con el export de hace una semana (el mismo que usa el juego)
+    import datetime as dt
+    from popcorn.export_store import ExportStore
+    from popcorn.tmdb import TMDbClient
+
+    ranked_ids = ExportStore().popularity_index(dt.date.today() - dt.timedelta(days=7)).ranked_ids
+    with TMDbClient(os.getenv("TMDB_API_KEY"), cache=DetailsCache()) as client:
+        print(prewarm(client, ranked_ids))
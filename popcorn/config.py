@@ -0,0 +1,83 @@
+# Configuración compartida por los módulos de Popcorn Quiz
+
+import os
+import tempfile
+
+## API de TMDb
+tmdb_api_url = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3")
+tmdb_languages = os.getenv("POPCORN_LANGUAGES", "es").split(",")   # Idiomas cuyo título y resumen se guardan de cada película
+
+## Imágenes de TMDb
+tmdb_image_url = os.getenv("TMDB_IMAGE_URL", "https://image.tmdb.org/t/p")
+poster_size = "w500"                # Tamaño de póster que se descarga (suficiente para mostrarlo en pantalla)
+poster_max_display = (500, 750)     # Tamaño máximo con el que se decodifica un póster para mostrarlo
+
+## Presentación de los pósters
+poster_display = os.getenv("POPCORN_DISPLAY", "auto")     # Modo: auto, halfblock, ascii, kitty, sixel, file o viewer
+poster_display_width = int(os.getenv("POPCORN_DISPLAY_WIDTH", "60"))   # Columnas de la terminal que ocupa un póster (halfblock/ascii)
+poster_display_pixels = 400         # Ancho máximo, en píxeles, de los pósters que se envían a la terminal (kitty/sixel)
+poster_display_dir = os.getenv("POPCORN_DISPLAY_DIR", os.path.join(tempfile.gettempdir(), "popcorn-posters"))   # Carpeta del modo file
+poster_display_url = os.getenv("POPCORN_DISPLAY_URL")     # URL desde la que se sirve esa carpeta a clientes web (opcional)
+poster_display_timeout = float(os.getenv("POPCORN_DISPLAY_TIMEOUT", "5"))   # Segundos máximos de espera a que un póster esté listo
+
+## Cliente concurrente de detalles
+tmdb_concurrency = 16       # Peticiones simultáneas como máximo (y tamaño del pool de conexiones)
+tmdb_rate_limit = 40        # Peticiones por segundo permitidas por el token bucket
+tmdb_timeout = (3.05, 10)   # Timeouts de conexión y lectura de cada petición, en segundos
+tmdb_max_retries = 4        # Reintentos ante errores 429/5xx o de red
+tmdb_backoff = 0.5          # Espera base (en segundos) del backoff exponencial
+
+## Export diario de IDs de TMDb
+tmdb_export_url = os.getenv("TMDB_EXPORT_URL", "http://files.tmdb.org/p/exports/movie_ids_{month}_{day}_{year}.json.gz")
+export_fallback_days = 7        # Días alrededor de la fecha pedida en los que buscar un export publicado
+export_retry_interval = 3600    # Segundos tras los que se vuelve a buscar el export de la fecha pedida
+export_parse_workers = int(os.getenv("POPCORN_EXPORT_WORKERS", "1"))   # Procesos que decodifican el export (1: en streaming)
+
+# Tramos de popularidad (posiciones en el ranking) de los que se sacan las películas de cada dificultad
+difficulty_bands = {
+    1: (0, 250),
+    2: (1000, 2000),
+    3: (4000, 6000),
+    4: (8000, 10000)
+}
+
+# Nombres de cada dificultad, tal y como se muestran al jugador y en el ranking
+difficulty_labels = {
+    1: "1 - American Pie",
+    2: "2 - Mi vecino Totoro",
+    3: "3 - Los Vengadores",
+    4: "4 - Pulp Fiction"
+}
+
+## Caché local
+cache_dir = os.getenv("POPCORN_CACHE_DIR", "./cache")
+details_cache_ttl = 30 * 24 * 3600    # Segundos tras los que se vuelven a pedir los detalles de una película
+details_cache_max_entries = 50000     # Número máximo de películas guardadas antes de expulsar las menos usadas
+poster_memory_items = 32              # Pósters decodificados que se mantienen en memoria
+poster_disk_max_bytes = 200 * 1024**2 # Tamaño máximo de la caché de pósters en disco
+question_bank_size = 1000             # Preguntas de cada tipo que se guardan en el banco de cada dificultad
+
+## Modo servidor
+server_pool_size = 200                # Películas del conjunto compartido por todas las partidas de cada dificultad
+server_refresh_interval = 6 * 3600    # Segundos entre renovaciones del conjunto de películas compartido
+server_daily_retry_interval = 300     # Segundos tras los que se reintenta preparar un reto diario que ha fallado
+index_refresh_interval = 3600         # Segundos entre actualizaciones incrementales del índice de popularidad
+index_refresh_margin = 5000           # Posiciones de más del índice para absorber las películas que bajan del ranking
+server_session_ttl = 3600             # Segundos de inactividad tras los que se descarta una partida
+server_max_sessions = 10000           # Partidas simultáneas como máximo
+server_threads = 32                   # Hilos del servidor WSGI (waitress) que atienden peticiones a la vez
+
+## Telemetría
+telemetry_enabled = os.getenv("POPCORN_TELEMETRY", "") not in ("", "0")   # Medir tiempos y contadores de cada etapa
+telemetry_log = os.getenv("POPCORN_TELEMETRY_LOG")                      # Fichero JSON Lines con cada medida (opcional)
+telemetry_profile_dir = os.getenv("POPCORN_PROFILE")                    # Carpeta de perfiles cProfile/tracemalloc de la preparación (opcional)
+
+## Sorteos
+daily_challenge = os.getenv("POPCORN_DAILY", "") not in ("", "0")   # Reto diario: las mismas preguntas para todos los jugadores del día
+daily_pool_size = 200                 # Películas del conjunto del reto diario, el mismo en el juego y en el servidor
+session_seed = int(os.getenv("POPCORN_SEED")) if os.getenv("POPCORN_SEED") else None   # Semilla de la partida, para repetirla (opcional)
+
+## Ranking
+leaderboard_path = os.getenv("POPCORN_LEADERBOARD", "./ranking.sqlite3")
+leaderboard_top_n = 3                 # Posiciones del ranking que se muestran
+legacy_ranking_path = "./Ranking.txt" # Ranking de versiones anteriores, que se importa la primera vez
@@ -0,0 +1,336 @@
+# Presentación de los pósters fuera del bucle del juego, con varios modos según dónde se juegue
+
+import base64
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from io import BytesIO
+
+import numpy as np
+
+from popcorn import config
+
+# Caracteres de la representación ASCII, de menos a más luminosos
+ASCII_RAMP = " .:-=+*#%@"
+
+# Repeticiones de un mismo carácter sixel, que se comprimen como "!<veces><carácter>"
+RUN = re.compile(r"(.)\1{3,}")
+
+
+
+def downsample(pixels, rows, cols):
+
+    """
+    Reduce una imagen promediando los píxeles de cada bloque, con operaciones vectorizadas de NumPy.
+
+    Args:
+        pixels (numpy.ndarray): Los píxeles de la imagen, con forma (alto, ancho, canales).
+        rows (int): El número de filas de la imagen reducida (como mucho, el alto original).
+        cols (int): El número de columnas de la imagen reducida (como mucho, el ancho original).
+
+    Returns:
+        numpy.ndarray: La imagen reducida, con forma (rows, cols, canales) y valores enteros de 0 a 255.
+    """
+
+    height, width = pixels.shape[:2]
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+
+    # Sumar los píxeles de cada bloque (reduceat) y dividir por su número de píxeles
+    sums = np.add.reduceat(np.add.reduceat(pixels.astype(np.float64), row_edges[:-1], axis=0), col_edges[:-1], axis=1)
+    counts = np.diff(row_edges)[:, None, None] * np.diff(col_edges)[None, :, None]
+
+    return np.rint(sums / counts).astype(np.uint8)
+
+
+
+def fit(img, max_width, max_height=None):
+
+    """
+    Calcula el tamaño con el que se muestra una imagen sin superar un ancho (y un alto) máximos.
+
+    Returns:
+        tuple: El ancho y el alto, conservando la proporción y sin ampliar la imagen.
+    """
+
+    scale = min(1.0, max_width / img.width, (max_height or img.height) / img.height)
+
+    return max(1, round(img.width * scale)), max(1, round(img.height * scale))
+
+
+
+class HalfBlockDisplay:
+
+    """
+    Dibuja la imagen en la propia terminal con el carácter "▀": cada celda muestra dos píxeles,
+    el de arriba con el color del texto y el de abajo con el del fondo (color de 24 bits). Sin
+    color, cada celda se dibuja con un carácter ASCII según su luminosidad.
+
+    Args:
+        width (int): Número máximo de columnas de la terminal que ocupa la imagen.
+        color (bool): Si se usa color; si no, se dibuja con caracteres ASCII.
+    """
+
+    def __init__(self, width=config.poster_display_width, color=True):
+        self.width = width
+        self.color = color
+
+    def render(self, img, name):
+        img = img.convert("RGB")
+        pixels = np.asarray(img)
+        cols = min(self.width, img.width)
+
+        # Las celdas de la terminal miden el doble de alto que de ancho
+        if not self.color:
+            rows = max(1, min(img.height, round(img.height / img.width * cols / 2)))
+            luminance = downsample(pixels, rows, cols) @ np.array([0.299, 0.587, 0.114])
+            ramp = np.array(list(ASCII_RAMP))
+            chars = ramp[np.minimum((luminance / 256 * len(ASCII_RAMP)).astype(int), len(ASCII_RAMP) - 1)]
+            return "\n".join("".join(row) for row in chars) + "\n"
+
+        rows = max(1, min(img.height // 2, round(img.height / img.width * cols / 2)))
+        small = downsample(pixels, rows * 2, cols)
+        top, bottom = small[0::2], small[1::2]
+        lines = []
+        for top_row, bottom_row in zip(top.tolist(), bottom.tolist()):
+            lines.append("".join(
+                f"\x1b[38;2;{r1};{g1};{b1}m\x1b[48;2;{r2};{g2};{b2}m▀" for (r1, g1, b1), (r2, g2, b2) in zip(top_row, bottom_row)
+            ) + "\x1b[0m")
+
+        return "\n".join(lines) + "\n"
+
+
+
+class KittyDisplay:
+
+    """
+    Muestra la imagen en la terminal con el protocolo gráfico de kitty (también lo entienden
+    WezTerm, Ghostty y Konsole), enviándola como PNG en trozos codificados en base64.
+
+    Args:
+        width (int): Ancho máximo de la imagen, en píxeles.
+    """
+
+    def __init__(self, width=config.poster_display_pixels):
+        self.width = width
+
+    def render(self, img, name):
+        buffer = BytesIO()
+        img.convert("RGB").resize(fit(img, self.width)).save(buffer, format="PNG")
+        data = base64.standard_b64encode(buffer.getvalue()).decode("ascii")
+
+        chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)]
+        escapes = []
+        for i, chunk in enumerate(chunks):
+            more = int(i < len(chunks) - 1)
+            control = f"a=T,f=100,m={more}" if i == 0 else f"m={more}"
+            escapes.append(f"\x1b_G{control};{chunk}\x1b\\")
+
+        return "".join(escapes) + "\n"
+
+
+
+class SixelDisplay:
+
+    """
+    Muestra la imagen en la terminal con gráficos sixel (xterm -ti vt340, mlterm, foot, WezTerm...),
+    reduciéndola a una paleta de hasta 256 colores.
+
+    Args:
+        width (int): Ancho máximo de la imagen, en píxeles.
+    """
+
+    def __init__(self, width=config.poster_display_pixels):
+        self.width = width
+
+    def render(self, img, name):
+        quantized = img.convert("RGB").resize(fit(img, self.width)).quantize(colors=256)
+        pixels = np.asarray(quantized)
+        height, width = pixels.shape
+        palette = np.array(quantized.getpalette()[:3 * (int(pixels.max()) + 1)]).reshape(-1, 3) * 100 // 255
+
+        output = ["\x1bPq", f'"1;1;{width};{height}']
+        output.extend(f"#{i};2;{r};{g};{b}" for i, (r, g, b) in enumerate(palette.tolist()))
+
+        # Cada banda de 6 filas se escribe color a color: cada columna es un carácter con un bit por fila
+        columns = np.arange(width)
+        for top in range(0, height, 6):
+            bits = np.zeros((len(palette), width), dtype=np.uint8)
+            for row, colors in enumerate(pixels[top:top + 6]):
+                bits[colors, columns] |= 1 << row
+            for color in np.flatnonzero(bits.any(axis=1)).tolist():
+                sixels = (bits[color] + 63).tobytes().decode("ascii")
+                sixels = RUN.sub(lambda m: f"!{len(m.group(0))}{m.group(1)}", sixels)
+                output.append(f"#{color}{sixels}$")
+            output.append("-")
+        output.append("\x1b\\")
+
+        return "".join(output) + "\n"
+
+
+
+class FileDisplay:
+
+    """
+    Guarda la imagen como JPEG en una carpeta temporal e indica dónde verla: su ruta o, si se
+    sirve esa carpeta por HTTP para clientes web, su URL.
+
+    Args:
+        directory (str): La carpeta en la que se guardan las imágenes.
+        base_url (str): La URL desde la que se sirve la carpeta. Opcional.
+        keep (int): Número de imágenes que se conservan en la carpeta.
+    """
+
+    def __init__(self, directory=config.poster_display_dir, base_url=config.poster_display_url, keep=20):
+        self.directory = directory
+        self.base_url = base_url
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def render(self, img, name):
+        filename = f"{name}-{time.time_ns()}.jpg"
+        img.convert("RGB").save(os.path.join(self.directory, filename), format="JPEG", quality=90)
+
+        # Borrar las imágenes más antiguas
+        entries = sorted(os.scandir(self.directory), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:-self.keep]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+        location = f"{self.base_url.rstrip('/')}/{filename}" if self.base_url else os.path.join(self.directory, filename)
+        return f"Imagen: {location}\n"
+
+
+
+class ViewerDisplay:
+
+    """
+    Abre la imagen en el visor de imágenes del sistema (Image.show), como en las primeras versiones del juego.
+    """
+
+    def render(self, img, name):
+        img.show()
+        return ""
+
+
+
+# Modos de presentación disponibles
+BACKENDS = {
+    "halfblock": HalfBlockDisplay,
+    "ascii": lambda: HalfBlockDisplay(color=False),
+    "kitty": KittyDisplay,
+    "sixel": SixelDisplay,
+    "file": FileDisplay,
+    "viewer": ViewerDisplay
+}
+
+
+
+def detect_backend(stream=None):
+
+    """
+    Elige el modo de presentación más adecuado para la terminal en la que se juega.
+
+    Args:
+        stream (file-like): La salida en la que se muestran las imágenes. Por defecto, sys.stdout.
+
+    Returns:
+        str: El nombre del modo ("kitty", "sixel", "halfblock", "ascii" o "file").
+    """
+
+    stream = stream or sys.stdout
+    if not getattr(stream, "isatty", lambda: False)():
+        return "file"
+    term = os.getenv("TERM", "")
+    if os.getenv("KITTY_WINDOW_ID") or "kitty" in term or os.getenv("TERM_PROGRAM") in ("WezTerm", "ghostty"):
+        return "kitty"
+    if "sixel" in term or term in ("mlterm", "foot", "yaft-256color"):
+        return "sixel"
+    if os.getenv("COLORTERM") in ("truecolor", "24bit"):
+        return "halfblock"
+
+    return "ascii"
+
+
+
+class PosterDisplay:
+
+    """
+    Prepara la presentación de los pósters en un hilo propio: la descarga, la decodificación, el
+    recorte y la conversión al modo de presentación se hacen en segundo plano, y al hilo principal
+    sólo le queda escribir el resultado, de modo que mostrar un póster nunca retrasa las respuestas.
+
+    Args:
+        backend (str | object): El modo de presentación (ver BACKENDS), o un objeto con un método
+                                render(img, name). Por defecto, el de la configuración o, si es
+                                "auto", el que mejor se adapte a la terminal.
+    """
+
+    def __init__(self, backend=None):
+        backend = backend or config.poster_display
+        if backend == "auto":
+            backend = detect_backend()
+        self.backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poster-display")
+
+    def prepare(self, load, name):
+
+        """
+        Lanza en segundo plano la obtención y la conversión de una imagen.
+
+        Args:
+            load (callable): La función que obtiene la imagen (PIL.Image.Image).
+            name (str): Un nombre corto de la imagen (por ejemplo, "recorte" o "cartel").
+
+        Returns:
+            concurrent.futures.Future: El texto que hay que escribir en la terminal para mostrarla.
+        """
+
+        return self.executor.submit(lambda: self.backend.render(load(), name))
+
+    def show(self, future, timeout=None):
+
+        """
+        Escribe una imagen preparada, esperando como mucho timeout segundos a que esté lista.
+
+        Args:
+            future (concurrent.futures.Future): La imagen preparada con prepare.
+            timeout (float): Segundos máximos de espera. Por defecto, sin límite.
+
+        Returns:
+            bool: True si se ha podido mostrar la imagen, False si no estaba lista o ha fallado.
+        """
+
+        try:
+            text = future.result(timeout)
+        except TimeoutError:
+            print("No se ha podido mostrar la imagen: no ha estado lista a tiempo.")
+            return False
+        except Exception as e:
+            print(f"No se ha podido mostrar la imagen: {e}")
+            return False
+        if text:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        return True
+
+
+
+# Presentación compartida por todas las preguntas, creada la primera vez que se muestra un póster
+default_display = None
+default_display_lock = threading.Lock()
+
+
+
+def get_default_display():
+    global default_display
+    with default_display_lock:
+        if default_display is None:
+            default_display = PosterDisplay()
+        return default_display
@@ -0,0 +1,117 @@
+# Índices de películas válidas para cada tipo de pregunta
+
+import datetime as dt
+
+import numpy as np
+
+from popcorn.sampling import default_rng, sample_positions, shuffled
+
+# Tipos de pregunta del juego y número de opciones que se muestran en cada una
+QUESTION_TYPES = ["release_date", "overview", "details", "poster_piece"]
+OPTIONS_PER_QUESTION = 4
+
+
+
+def eligibility_masks(movie_pool):
+
+    """
+    Calcula, para cada tipo de pregunta, qué películas pueden ser su respuesta correcta.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+
+    Returns:
+        dict: Un array booleano por tipo de pregunta, alineado con las películas del conjunto.
+    """
+
+    has_overview = np.fromiter((bool(overview and overview.strip()) for overview in movie_pool.overviews), dtype=bool, count=len(movie_pool))
+    has_poster = np.fromiter((bool(url) for url in movie_pool.poster_urls), dtype=bool, count=len(movie_pool))
+    has_release = movie_pool.release_years > 0
+    # Los años de las opciones no pasan del que viene: una película que se estrena más tarde no deja
+    # suficientes años para las opciones incorrectas en las dificultades altas
+    has_option_years = has_release & (movie_pool.release_years <= dt.date.today().year + 1)
+    has_financials = (movie_pool.budgets > 0) & (movie_pool.revenues > 0)
+
+    return {
+        "release_date": has_option_years,
+        "overview": has_overview,
+        "details": has_release & (movie_pool.genre_counts() > 0) & has_financials & (movie_pool.runtimes > 0),
+        "poster_piece": has_poster
+    }
+
+
+
+class EligibilityIndex:
+
+    """
+    Posiciones de las películas válidas para cada tipo de pregunta, calculadas una sola vez al
+    cargar las películas, para elegir directamente la respuesta correcta sin tener que repetir
+    el sorteo hasta dar con una película con todos los datos.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+    """
+
+    def __init__(self, movie_pool):
+        self.size = len(movie_pool)
+        self.candidates = {
+            question_type: np.flatnonzero(mask)
+            for question_type, mask in eligibility_masks(movie_pool).items()
+        }
+
+    def missing(self):
+
+        """
+        Detecta los tipos de pregunta que no se pueden generar con las películas disponibles.
+
+        Returns:
+            list: Los tipos de pregunta sin ninguna respuesta válida (o todos, si no hay
+                  suficientes películas para las opciones).
+        """
+
+        if self.size < OPTIONS_PER_QUESTION:
+            return list(QUESTION_TYPES)
+
+        return [question_type for question_type in QUESTION_TYPES if len(self.candidates[question_type]) == 0]
+
+    def draw_one(self, question_type, rng=None):
+
+        """
+        Elige al azar la posición de una película válida para un tipo de pregunta.
+
+        Args:
+            question_type (str): El tipo de pregunta.
+            rng (numpy.random.Generator): El generador de números aleatorios. Opcional.
+
+        Returns:
+            int: La posición de la película elegida.
+        """
+
+        candidates = self.candidates[question_type]
+        if len(candidates) == 0:
+            raise ValueError(f"No hay ninguna película válida para la pregunta '{question_type}'.")
+
+        return int(candidates[int((rng or default_rng()).random() * len(candidates))])
+
+    def draw(self, question_type, rng=None):
+
+        """
+        Elige al azar las opciones de una pregunta: una película válida como respuesta correcta
+        y el resto entre cualquiera de las demás películas, en O(k) sin copiar ningún array.
+
+        Args:
+            question_type (str): El tipo de pregunta.
+            rng (numpy.random.Generator): El generador de números aleatorios. Opcional.
+
+        Returns:
+            tuple: Las posiciones de las opciones, desordenadas, y la posición de la respuesta correcta.
+        """
+
+        rng = rng or default_rng()
+        correct = self.draw_one(question_type, rng)
+
+        # Elegir las opciones incorrectas sin repetición entre todas las posiciones salvo la correcta
+        decoys = sample_positions(rng, self.size, OPTIONS_PER_QUESTION - 1, exclude=correct)
+        options = shuffled(rng, decoys + [correct])
+
+        return options, correct
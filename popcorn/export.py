@@ -0,0 +1,128 @@
+# Lectura en streaming del export diario de IDs de películas de TMDb
+
+import gzip
+import io
+import json
+import time
+import urllib.request
+from array import array
+
+from popcorn import config, telemetry
+
+# Decodificador JSON rápido opcional: si orjson está instalado se usa para cada línea del export
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+
+def export_url(date):
+
+    """
+    Construye la URL del export diario de IDs de películas de TMDb para una fecha.
+
+    Args:
+        date (datetime.date): La fecha del export.
+
+    Returns:
+        str: La URL del archivo comprimido con los IDs de películas de esa fecha.
+    """
+
+    return config.tmdb_export_url.format(month=f"{date.month:02d}", day=f"{date.day:02d}", year=date.year)
+
+
+
+def parse_export_lines(lines):
+
+    """
+    Decodifica línea a línea un export de IDs de TMDb conservando sólo el ID y la popularidad.
+
+    Args:
+        lines (iterable): Un iterable de líneas (bytes o str) en formato JSON Lines.
+
+    Returns:
+        tuple: Dos arrays compactos (array.array) con los IDs ("q") y la popularidad ("d")
+               de cada película, en el mismo orden que el export.
+    """
+
+    ids = array("q")
+    popularity = array("d")
+
+    # Decodificar cada línea por separado e ignorar (avisando) las que estén mal formadas
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            movie = loads(line)
+            movie_id = int(movie["id"])
+            movie_popularity = float(movie["popularity"])
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, ValueError) as e:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            print(f"Error decodificando JSON en la línea: {line}")
+            print(f"Error: {e}")
+            continue
+        ids.append(movie_id)
+        popularity.append(movie_popularity)
+
+    return ids, popularity
+
+
+
+def parse_export_stream(response):
+
+    """
+    Descomprime y procesa en streaming un export de IDs a medida que se descarga.
+
+    Con la telemetría activada, se mide por separado el tiempo de descarga (lecturas de la red),
+    de descompresión y de decodificación de las líneas, además de los bytes descargados.
+
+    Args:
+        response (file-like): La respuesta HTTP (o un fichero) con el export comprimido con gzip.
+
+    Returns:
+        tuple: Dos arrays compactos (array.array) con los IDs y la popularidad de cada película.
+    """
+
+    if not telemetry.enabled:
+        with gzip.GzipFile(fileobj=response) as gz:
+            return parse_export_lines(gz)
+
+    # Envolver la red y el gzip para saber cuánto tiempo se pasa leyendo de cada uno
+    start = time.perf_counter()
+    network = telemetry.TimedReader(response)
+    with gzip.GzipFile(fileobj=io.BufferedReader(network)) as gz:
+        decompressed = telemetry.TimedReader(gz)
+        ids, popularity = parse_export_lines(io.BufferedReader(decompressed, buffer_size=64 * 1024))
+    elapsed = time.perf_counter() - start
+
+    telemetry.observe("export_download", network.seconds)
+    telemetry.observe("export_decompress", decompressed.seconds - network.seconds)
+    telemetry.observe("export_parse", elapsed - decompressed.seconds)
+    telemetry.count("http_bytes", network.bytes, resource="export")
+
+    return ids, popularity
+
+
+
+def read_export_index(url):
+
+    """
+    Descarga y procesa en streaming el export diario de IDs de películas de TMDb.
+
+    El fichero gzip se descomprime de forma incremental directamente desde la conexión, sin
+    guardar en memoria ni el fichero comprimido ni el descomprimido, así que el consumo de
+    memoria sólo depende del número de películas y no del tamaño de cada línea del export.
+
+    Args:
+        url (str): La URL del archivo comprimido (gzip) con los IDs de películas en formato JSON Lines.
+
+    Returns:
+        tuple: Dos arrays compactos (array.array) con los IDs y la popularidad de cada película.
+    """
+
+    with urllib.request.urlopen(url) as response:
+        return parse_export_stream(response)
@@ -0,0 +1,460 @@
+# Almacén en disco del último export diario de IDs de TMDb ya procesado
+
+import contextlib
+import datetime as dt
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from array import array
+
+import numpy as np
+
+from popcorn import config, telemetry
+from popcorn.export import export_url, parse_export_stream
+from popcorn.parallel_export import parse_export_parallel
+from popcorn.popularity import PopularityIndex, diff_exports, top_k, update_top_k
+
+# Bloqueo de ficheros entre procesos: fcntl en Linux y macOS, msvcrt en Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+
+def lock_file(f):
+
+    """
+    Bloquea un fichero abierto frente a otros procesos, esperando a que lo liberen si hace falta.
+
+    Args:
+        f (file): El fichero abierto en modo binario.
+
+    Returns:
+        None
+    """
+
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass
+
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+
+class ExportStore:
+
+    """
+    Guarda en disco el índice (IDs y popularidad) del último export diario descargado para
+    reutilizarlo en las siguientes partidas sin volver a descargarlo.
+
+    Si el export de la fecha pedida todavía no está publicado, se usa el de la fecha disponible
+    más cercana, y se vuelve a intentar con la fecha pedida pasado un tiempo.
+
+    Varios procesos pueden compartir la misma carpeta (por ejemplo, dos partidas y el servidor, o
+    la actualización nocturna con python -m popcorn.parallel_export): la descarga y la publicación
+    de un índice nuevo se hacen con la carpeta bloqueada (ver locked) y cada escritura usa su propio
+    fichero temporal.
+
+    Args:
+        directory (str): La carpeta en la que se guarda el índice.
+        fallback_days (int): Número máximo de días de distancia a la fecha pedida que se buscan.
+        retry_interval (float): Segundos tras los que se vuelve a comprobar un índice que no es
+                                de la fecha pedida (o cuya fecha no se ha podido validar).
+        workers (int): Número de procesos con los que se decodifica el export. Con uno solo, se
+                       procesa en streaming sin cargarlo entero en memoria.
+    """
+
+    def __init__(self, directory=None, fallback_days=config.export_fallback_days,
+                 retry_interval=config.export_retry_interval, workers=config.export_parse_workers):
+        self.directory = directory or os.path.join(config.cache_dir, "exports")
+        self.fallback_days = fallback_days
+        self.retry_interval = retry_interval
+        self.workers = workers
+        self.lock = threading.RLock()
+        self.lock_file = None
+        self.lock_depth = 0
+        self.deltas = []
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def tmp_path(self, name):
+        return self.path(f"{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    @contextlib.contextmanager
+    def locked(self):
+
+        """
+        Bloquea el almacén frente a los demás hilos y procesos que usan la misma carpeta, durante
+        el bloque de un with. Se puede anidar dentro del mismo hilo.
+
+        Returns:
+            None
+        """
+
+        with self.lock:
+            if self.lock_depth == 0:
+                self.lock_file = open(self.path("store.lock"), "a+b")
+                lock_file(self.lock_file)
+            self.lock_depth += 1
+            try:
+                yield
+            finally:
+                self.lock_depth -= 1
+                if self.lock_depth == 0:
+                    unlock_file(self.lock_file)
+                    self.lock_file.close()
+                    self.lock_file = None
+
+    def read_meta(self):
+
+        """
+        Lee los metadatos del índice guardado.
+
+        Returns:
+            dict: La fecha del export, su URL, sus cabeceras ETag/Last-Modified y el momento de
+                  la última comprobación, o None si no hay ningún índice guardado.
+        """
+
+        try:
+            with open(self.path("meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def write_meta(self, meta):
+        tmp_path = self.tmp_path("meta.json")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.path("meta.json"))
+
+    def read_index(self):
+
+        """
+        Lee del disco el índice guardado.
+
+        Returns:
+            tuple: Dos arrays compactos (array.array) con los IDs y la popularidad de cada película.
+        """
+
+        ids = array("q")
+        popularity = array("d")
+        for values, name in [(ids, "ids.bin"), (popularity, "popularity.bin")]:
+            with open(self.path(name), "rb") as f:
+                values.fromfile(f, os.path.getsize(self.path(name)) // values.itemsize)
+
+        return ids, popularity
+
+    def write_index(self, ids, popularity):
+
+        # Invalidar los metadatos y el índice de popularidad antes de sobrescribir el índice,
+        # por si se interrumpe la escritura
+        for name in ["meta.json", "popularity.npy"]:
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+        for values, name in [(ids, "ids.bin"), (popularity, "popularity.bin")]:
+            tmp_path = self.tmp_path(name)
+            with open(tmp_path, "wb") as f:
+                values.tofile(f)
+            os.replace(tmp_path, self.path(name))
+
+    def candidate_dates(self, date):
+
+        """
+        Ordena las fechas en las que buscar el export, de la más cercana a la más lejana a la pedida.
+
+        Args:
+            date (datetime.date): La fecha pedida.
+
+        Returns:
+            list: Las fechas candidatas, sin incluir ninguna posterior a hoy.
+        """
+
+        today = dt.date.today()
+        dates = [date]
+        for offset in range(1, self.fallback_days + 1):
+            dates.append(date - dt.timedelta(days=offset))
+            if date + dt.timedelta(days=offset) <= today:
+                dates.append(date + dt.timedelta(days=offset))
+
+        return dates
+
+    def download(self, date, meta, top_n=None):
+
+        """
+        Descarga y procesa en streaming el export de una fecha, validando con ETag/Last-Modified
+        el índice guardado si es de esa misma fecha.
+
+        Args:
+            date (datetime.date): La fecha del export.
+            meta (dict): Los metadatos del índice guardado, o None.
+            top_n (int): Número de posiciones del ranking de popularidad que se construyen a la vez
+                         que se decodifica el export, si se hace en paralelo. Opcional.
+
+        Returns:
+            tuple: Los arrays de IDs y popularidad (None si el índice guardado sigue siendo válido),
+                   el ranking de las top_n más populares (None si no se ha construido) y los nuevos
+                   metadatos, o None si el export de esa fecha no existe.
+        """
+
+        url = export_url(date)
+        headers = {}
+        if meta is not None and meta["url"] == url:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                telemetry.count("http_requests", resource="export", status=response.status)
+                ranked = None
+                if self.workers > 1:
+                    ids, popularity, ranked = parse_export_parallel(response, self.workers, top_n)
+                else:
+                    ids, popularity = parse_export_stream(response)
+                new_meta = {
+                    "date": date.isoformat(),
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+                return ids, popularity, ranked, new_meta
+        except urllib.error.HTTPError as e:
+            telemetry.count("http_requests", resource="export", status=e.code)
+            if e.code == 304:
+                return None, None, None, dict(meta)
+            if e.code in (403, 404):
+                return None
+            raise
+
+    def has_index(self, meta):
+        return meta is not None and "index_top_n" in meta and os.path.exists(self.path("popularity.npy"))
+
+    def is_current(self, meta, date):
+
+        """
+        Comprueba si el índice guardado sirve para la fecha pedida sin tener que consultar la red.
+
+        Args:
+            meta (dict): Los metadatos del índice guardado, o None.
+            date (datetime.date): La fecha del export pedida.
+
+        Returns:
+            bool: True si el índice es de la fecha pedida, o de una cercana comprobada hace poco.
+        """
+
+        if meta is None or meta["requested"] != date.isoformat():
+            return False
+
+        return meta["date"] == date.isoformat() or time.time() - meta["checked_at"] < self.retry_interval
+
+    def load(self, date, top_n=None):
+
+        """
+        Obtiene el índice del export de una fecha, reutilizando el guardado en disco siempre que
+        sea posible.
+
+        Args:
+            date (datetime.date): La fecha del export pedida.
+            top_n (int): Si se indica y el export se decodifica en paralelo, se guarda también el
+                         índice de popularidad de top_n posiciones, construido uniendo los
+                         rankings de cada trozo sin recorrer de nuevo el export completo.
+
+        Returns:
+            tuple: Dos arrays compactos (array.array) con los IDs y la popularidad de cada película.
+        """
+
+        if isinstance(date, dt.datetime):
+            date = date.date()
+        with self.locked():
+            return self.load_locked(date, top_n)
+
+    def load_locked(self, date, top_n=None):
+        meta = self.read_meta()
+
+        # Reutilizar sin tocar la red el índice de la fecha pedida, o uno cercano comprobado hace poco
+        if self.is_current(meta, date):
+            return self.read_index()
+
+        # Buscar el export más cercano a la fecha pedida
+        for candidate in self.candidate_dates(date):
+            try:
+                result = self.download(candidate, meta, top_n)
+            except (urllib.error.URLError, OSError) as e:
+                if meta is None:
+                    raise
+                print(f"No se ha podido descargar el export de películas ({e}), se usará el del {meta['date']}.")
+                return self.read_index()
+            if result is None:
+                continue
+
+            ids, popularity, ranked, new_meta = result
+            if ids is not None:
+                self.write_index(ids, popularity)
+            else:
+                ids, popularity = self.read_index()
+            new_meta.update(requested=date.isoformat(), checked_at=time.time())
+            self.write_meta(new_meta)
+            if ranked is not None:
+                self.write_popularity_index(PopularityIndex(ranked), top_n)
+            return ids, popularity
+
+        # Si no hay ningún export cercano publicado, usar el guardado aunque sea antiguo
+        if meta is not None:
+            print(f"No se ha encontrado ningún export de películas reciente, se usará el del {meta['date']}.")
+            return self.read_index()
+        raise FileNotFoundError(f"No se ha encontrado ningún export de películas cercano al {date.isoformat()}.")
+
+    def popularity_index(self, date, top_n=None):
+
+        """
+        Obtiene el índice de popularidad del export de una fecha, construyéndolo sólo una vez por
+        export y leyéndolo después directamente del disco (memory-map).
+
+        Args:
+            date (datetime.date): La fecha del export pedida.
+            top_n (int): Número de posiciones del ranking que debe tener el índice. Por defecto,
+                         las necesarias para cubrir los tramos de todas las dificultades.
+
+        Returns:
+            popcorn.popularity.PopularityIndex: El índice de popularidad del export.
+        """
+
+        if isinstance(date, dt.datetime):
+            date = date.date()
+        if top_n is None:
+            top_n = max(end for start, end in config.difficulty_bands.values())
+
+        # Poner al día el export guardado si hace falta (una revalidación sin cambios conserva el índice).
+        # Si ya hay un índice, el cambio de export se aplica siempre con refresh, para que quien
+        # invalida las cachés (IndexRefresher) reciba las películas que han salido de los tramos
+        with self.locked():
+            meta = self.read_meta()
+            ids = popularity = None
+            if not self.is_current(meta, date):
+                if self.has_index(meta):
+                    self.refresh(date, top_n)
+                else:
+                    ids, popularity = self.load(date, top_n)
+                meta = self.read_meta()
+
+            # Reutilizar el índice guardado si tiene suficientes posiciones y, si no, construirlo y guardarlo
+            if meta.get("index_top_n", 0) >= top_n and os.path.exists(self.path("popularity.npy")):
+                return PopularityIndex.load(self.path("popularity.npy"))
+            if ids is None:
+                ids, popularity = self.read_index()
+            with telemetry.timer("index_build"):
+                index = PopularityIndex.build(ids, popularity, top_n)
+            self.write_popularity_index(index, top_n)
+
+        return index
+
+    def write_popularity_index(self, index, top_n):
+        tmp_path = self.tmp_path("popularity.npy")
+        index.save(tmp_path)
+        os.replace(tmp_path, self.path("popularity.npy"))
+        meta = self.read_meta()
+        meta["index_top_n"] = max(top_n, len(index))
+        self.write_meta(meta)
+
+    def refresh(self, date, top_n=None, margin=config.index_refresh_margin):
+
+        """
+        Pone al día el índice guardado con el export de una fecha aplicando sólo los cambios
+        respecto al anterior: el ranking de popularidad se actualiza con las películas nuevas,
+        desaparecidas o cuya popularidad ha cambiado, sin reconstruirlo desde el export completo.
+
+        Args:
+            date (datetime.date): La fecha del export pedida.
+            top_n (int): Número de posiciones del ranking que debe tener el índice. Por defecto,
+                         las necesarias para cubrir los tramos de todas las dificultades.
+            margin (int): Posiciones de más que se guardan al reconstruir el ranking, para que las
+                          siguientes actualizaciones puedan cubrir las películas que bajan de él.
+
+        Returns:
+            dict: Los cambios aplicados ("date", "removed", "changed", "incremental") y los IDs
+                  de las películas que han salido de los tramos de todas las dificultades
+                  ("dropped"), o None si el export guardado no ha cambiado. Los cambios quedan
+                  además pendientes hasta que se recogen con pop_deltas.
+        """
+
+        if isinstance(date, dt.datetime):
+            date = date.date()
+
+        with self.locked():
+            meta = self.read_meta()
+            if not self.has_index(meta):
+                self.popularity_index(date, top_n)
+                return None
+            if self.is_current(meta, date):
+                return None
+            if top_n is None:
+                top_n = max(end for start, end in config.difficulty_bands.values())
+
+            # Conservar en memoria el export y el ranking anteriores antes de que se sobrescriban
+            old_ids, old_popularity = self.read_index()
+            old_index = PopularityIndex(np.load(self.path("popularity.npy")))
+
+            # Si el export no ha cambiado (o no se ha podido descargar) se conserva el índice guardado
+            ids, popularity = self.load(date)
+            if os.path.exists(self.path("popularity.npy")):
+                return None
+
+            # Actualizar el ranking sólo con las películas que han cambiado
+            with telemetry.timer("index_delta"):
+                removed, changed_ids, changed_popularity = diff_exports(old_ids, old_popularity, ids, popularity)
+                ranked = update_top_k(old_index.ranked, removed, changed_ids, changed_popularity, top_n,
+                                      exhaustive=len(old_index) == len(old_ids))
+            incremental = ranked is not None
+            if not incremental:
+                with telemetry.timer("index_build"):
+                    ranked = top_k(ids, popularity, top_n + margin)
+            index = PopularityIndex(ranked)
+            self.write_popularity_index(index, top_n)
+
+            delta = {
+                "date": self.read_meta()["date"],
+                "removed": len(removed),
+                "changed": len(changed_ids),
+                "incremental": incremental,
+                "dropped": np.setdiff1d(old_index.members(), index.members())
+            }
+            self.deltas.append(delta)
+
+        return delta
+
+    def pop_deltas(self):
+
+        """
+        Recoge los cambios de export aplicados desde la última llamada, tanto por refresh como por
+        popularity_index al pasar al export de un día nuevo.
+
+        Returns:
+            list: Los cambios aplicados (ver refresh), del más antiguo al más reciente.
+        """
+
+        with self.lock:
+            deltas, self.deltas = self.deltas, []
+
+        return deltas
@@ -0,0 +1,186 @@
+# Ranking de los mejores jugadores, guardado en SQLite
+
+import os
+import sqlite3
+import threading
+import time
+
+from popcorn import config
+
+
+
+def read_legacy_ranking(path):
+
+    """
+    Lee el ranking de las versiones anteriores del juego (Ranking.txt: posición;jugador;dificultad;puntos).
+
+    Args:
+        path (str): La ruta del fichero.
+
+    Returns:
+        list: Las entradas del ranking, como tuplas (jugador, dificultad, puntos), de la primera
+              posición a la última.
+    """
+
+    # El fichero puede estar guardado en UTF-8 o en la codificación de Windows ("ANSI")
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("cp1252")
+
+    entries = []
+    for line in text.splitlines():
+        fields = line.strip().split(";")
+        if len(fields) == 4:
+            position, player, dificulty_label, points = fields
+            entries.append((int(position), player, dificulty_label, float(points)))
+
+    return [entry[1:] for entry in sorted(entries)]
+
+
+
+def format_board(rows):
+
+    """
+    Da formato de tabla a las entradas de un ranking.
+
+    Args:
+        rows (list): Las entradas del ranking, tal y como las devuelve Leaderboard.top.
+
+    Returns:
+        str: La tabla, con la posición, el jugador, la dificultad y los puntos de cada entrada.
+    """
+
+    player_width = max([len("Jugador")] + [len(row["player"]) for row in rows])
+    label_width = max([len("Dificultad")] + [len(row["dificulty_label"]) for row in rows])
+    lines = [f"{'':>3}  {'Jugador':<{player_width}}  {'Dificultad':<{label_width}}  {'Puntos':>6}"]
+    for position, row in enumerate(rows, start=1):
+        lines.append(f"{position:>3}  {row['player']:<{player_width}}  {row['dificulty_label']:<{label_width}}  {row['points']:>6.2f}")
+
+    return "\n".join(lines)
+
+
+
+class Leaderboard:
+
+    """
+    Ranking de puntuaciones guardado en SQLite. Cada partida se añade como una fila nueva dentro
+    de una transacción, de modo que varias partidas a la vez (en varios procesos o en el modo
+    servidor) no pierden puntuaciones. Los índices por puntos permiten insertar en O(log n) y leer
+    las primeras posiciones, general o de una dificultad, sin recorrer todo el historial.
+
+    A igualdad de puntos, la puntuación más reciente queda por delante.
+
+    Args:
+        path (str): La ruta del fichero SQLite.
+        top_n (int): Número de posiciones del ranking.
+        legacy_path (str): El ranking de versiones anteriores (Ranking.txt) que se importa al crear el fichero.
+    """
+
+    def __init__(self, path=config.leaderboard_path, top_n=config.leaderboard_top_n, legacy_path=config.legacy_ranking_path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.top_n = top_n
+        self.lock = threading.Lock()
+
+        # Una única conexión compartida entre hilos y protegida por el lock; las transacciones se abren a mano
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, player TEXT NOT NULL, dificulty INTEGER, "
+                "dificulty_label TEXT NOT NULL, points REAL NOT NULL, played_at REAL NOT NULL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS scores_points ON scores (points DESC, id DESC)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS scores_dificulty_points ON scores (dificulty, points DESC, id DESC)")
+
+            # Importar el ranking anterior la primera vez, de la última posición a la primera para respetar los empates
+            empty = self.connection.execute("SELECT NOT EXISTS (SELECT 1 FROM scores)").fetchone()[0]
+            if empty and legacy_path and os.path.exists(legacy_path):
+                self.connection.executemany(
+                    "INSERT INTO scores (player, dificulty, dificulty_label, points, played_at) VALUES (?, NULL, ?, ?, 0)",
+                    reversed(read_legacy_ranking(legacy_path))
+                )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def close(self):
+
+        """
+        Cierra la conexión con el fichero SQLite.
+
+        Returns:
+            None
+        """
+
+        with self.lock:
+            self.connection.close()
+
+    def add(self, player, dificulty, dificulty_label, points):
+
+        """
+        Añade la puntuación de una partida y calcula la posición que ocupa en el ranking general.
+
+        Args:
+            player (str): El nombre del jugador.
+            dificulty (int): El nivel de dificultad de la partida.
+            dificulty_label (str): El nombre del nivel de dificultad.
+            points (float): Los puntos conseguidos.
+
+        Returns:
+            int: La posición en el ranking general, o None si queda fuera de las top_n primeras.
+        """
+
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                score_id = self.connection.execute(
+                    "INSERT INTO scores (player, dificulty, dificulty_label, points, played_at) VALUES (?, ?, ?, ?, ?)",
+                    (player, dificulty, dificulty_label, points, time.time())
+                ).lastrowid
+
+                # Contar sólo hasta top_n las puntuaciones por delante, recorriendo el índice por puntos
+                ahead = self.connection.execute(
+                    "SELECT COUNT(*) FROM (SELECT 1 FROM scores WHERE (points, id) > (?, ?) LIMIT ?)",
+                    (points, score_id, self.top_n)
+                ).fetchone()[0]
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+
+        return ahead + 1 if ahead < self.top_n else None
+
+    def top(self, n=None, dificulty=None):
+
+        """
+        Devuelve las primeras posiciones del ranking, general o de una dificultad.
+
+        Args:
+            n (int): Número de posiciones. Por defecto, top_n.
+            dificulty (int): El nivel de dificultad. Por defecto, el ranking general.
+
+        Returns:
+            list: Las entradas del ranking, como diccionarios con el jugador ("player"), la dificultad
+                  ("dificulty" y "dificulty_label"), los puntos ("points") y el momento de la partida ("played_at").
+        """
+
+        n = n or self.top_n
+        with self.lock:
+            if dificulty is None:
+                rows = self.connection.execute(
+                    "SELECT player, dificulty, dificulty_label, points, played_at FROM scores "
+                    "ORDER BY points DESC, id DESC LIMIT ?", (n,)
+                )
+            else:
+                rows = self.connection.execute(
+                    "SELECT player, dificulty, dificulty_label, points, played_at FROM scores "
+                    "WHERE dificulty = ? ORDER BY points DESC, id DESC LIMIT ?", (dificulty, n)
+                )
+            return [dict(row) for row in rows]
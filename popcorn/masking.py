@@ -0,0 +1,105 @@
+# Enmascarado de vocales de los resúmenes de la pregunta del resumen enmascarado
+
+import textwrap
+
+from popcorn import config
+
+# Vocales del español agrupadas por vocal (con tildes y diéresis); cada dificultad enmascara un grupo más
+VOWEL_GROUPS = [
+    ("AÁ", "aá"),
+    ("EÉ", "eé"),
+    ("IÍ", "ií"),
+    ("OÓ", "oó"),
+    ("UÚÜ", "uúü")
+]
+
+
+
+def build_mask_table(dificulty):
+
+    """
+    Construye la tabla de traducción que enmascara las vocales de una dificultad: las
+    mayúsculas se sustituyen por "X" y las minúsculas por "x".
+
+    Args:
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        dict: La tabla para str.translate.
+    """
+
+    table = {}
+    for uppercase, lowercase in VOWEL_GROUPS[:dificulty+1]:
+        table.update(str.maketrans(uppercase + lowercase, "X" * len(uppercase) + "x" * len(lowercase)))
+
+    return table
+
+
+
+# Tablas precalculadas para cada dificultad
+MASK_TABLES = {dificulty: build_mask_table(dificulty) for dificulty in config.difficulty_bands}
+
+
+
+def mask_text(text, dificulty):
+
+    """
+    Enmascara las vocales de un texto en una sola pasada.
+
+    Args:
+        text (str): El texto a enmascarar.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        str: El texto enmascarado, con la misma longitud que el original.
+    """
+
+    return text.translate(MASK_TABLES[dificulty])
+
+
+
+def wrap_and_mask(text, line_width, dificulty):
+
+    """
+    Formatea un texto en líneas y lo enmascara. Como el enmascarado sustituye cada vocal por un
+    solo carácter y no toca los espacios, el texto enmascarado se obtiene del ya formateado y
+    ambos quedan partidos exactamente en las mismas líneas.
+
+    Args:
+        text (str): El texto original.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        tuple: El texto formateado y el texto formateado y enmascarado.
+    """
+
+    wrapped = textwrap.fill(text, width=line_width)
+
+    return wrapped, mask_text(wrapped, dificulty)
+
+
+
+def mask_overviews(overviews, line_width, dificulty):
+
+    """
+    Formatea y enmascara de una vez todos los resúmenes de un conjunto de películas, para
+    preparar muchas preguntas (banco de preguntas, modo servidor) sin repetir el trabajo.
+
+    Args:
+        overviews (array-like): Los resúmenes de las películas (vacíos o None si no tienen).
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        tuple: Dos listas alineadas con los resúmenes: los formateados y los enmascarados.
+    """
+
+    wrapped = [textwrap.fill(overview, width=line_width) if overview else "" for overview in overviews]
+
+    # Enmascarar todos los resúmenes con una sola llamada a translate, separados por un carácter nulo
+    masked = "\0".join(wrapped).translate(MASK_TABLES[dificulty]).split("\0")
+    if len(masked) != len(wrapped):
+        masked = [mask_text(text, dificulty) for text in wrapped]
+
+    return wrapped, masked
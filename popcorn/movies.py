@@ -0,0 +1,176 @@
+# Obtención de las películas con las que se juega cada partida
+
+import datetime as dt
+import re
+
+import numpy as np
+
+from popcorn import telemetry
+from popcorn.eligibility import EligibilityIndex
+from popcorn.pool import MoviePool
+from popcorn.posters import build_poster_url
+from popcorn.records import localize
+from popcorn.sampling import default_rng
+
+
+
+def parse_movie_details(movie_details, language="es"):
+
+    """
+    Extrae del registro compacto de una película los detalles que usa el juego en un idioma.
+
+    Args:
+        movie_details (dict): El registro compacto de la película (ver popcorn.records.project_movie).
+        language (str): El idioma del título y el resumen.
+
+    Returns:
+        dict: Los detalles de la película: ID, título, géneros (lista), país de origen, sinopsis,
+              año de lanzamiento, presupuesto, ingresos, duración y URL del póster.
+    """
+
+    # Validar y convertir la fecha de lanzamiento  
+    if re.search(r"\d{4}-\d{2}-\d{2}", movie_details["release_date"] or ""):
+        release_date = dt.datetime.strptime(movie_details["release_date"], "%Y-%m-%d").year
+    else:
+        release_date = None
+
+    # Obtener el resto de detalles de la película, con el título y el resumen del idioma pedido
+    title, overview = localize(movie_details, language)
+    return {
+        "id": movie_details["id"],
+        "title": title,
+        "genres": movie_details["genres"],
+        "origin_country": movie_details["origin_country"][0] if movie_details["origin_country"] else None,
+        "overview": overview,
+        "release_date": release_date,
+        "budget": movie_details["budget"],
+        "revenue": movie_details["revenue"],
+        "runtime": movie_details["runtime"],
+        "poster_url": build_poster_url(movie_details["poster_path"])
+    }
+
+
+
+def get_movie_details(id, tmdb_client, language=None):
+
+    """
+    Obtiene los detalles de una película desde la API de The Movie Database (TMDb).
+
+    Args:
+        id (int): El ID de la película en TMDb.
+        tmdb_client (popcorn.tmdb.TMDbClient): El cliente de la API de TMDb.
+        language (str): El idioma del título y el resumen. Por defecto, el principal del cliente.
+
+    Returns:
+        dict: Los detalles de la película, tal y como los devuelve parse_movie_details.
+    """
+
+    # Usar la ID proporcionada para leer los datos de TMDB como JSON a través del cliente compartido
+    with telemetry.timer("movie_details"):
+        movie_details = tmdb_client.get_movie(id)
+
+        return parse_movie_details(movie_details, language or tmdb_client.language)
+
+
+
+def fetch_movie_records(movie_ids, tmdb_client, language=None):
+
+    """
+    Obtiene en paralelo los detalles de un lote de películas.
+
+    Args:
+        movie_ids (iterable): Los IDs de las películas en TMDb.
+        tmdb_client (popcorn.tmdb.TMDbClient): El cliente de la API de TMDb.
+        language (str): El idioma del título y el resumen. Por defecto, el principal del cliente.
+
+    Returns:
+        list: Los detalles de cada película, tal y como los devuelve parse_movie_details.
+    """
+
+    with telemetry.timer("movie_details_batch"):
+        return [parse_movie_details(movie_details, language or tmdb_client.language) for movie_details in tmdb_client.get_movies(movie_ids)]
+
+
+
+def build_movie_pool(records, dificulty):
+
+    """
+    Reúne de una sola vez los detalles de las películas en un conjunto de películas por columnas.
+
+    Args:
+        records (list): Los detalles de cada película, tal y como los devuelve parse_movie_details.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        popcorn.pool.MoviePool: Las películas con título, géneros, país de origen, resumen,
+                                lanzamiento, presupuesto, recaudación, duración y URL del póster.
+    """
+
+    movie_pool = MoviePool.from_records(records)
+
+    # Filtrar películas de USA para los primeros niveles de dificultad
+    if dificulty in [1, 2, 3]:
+        movie_pool = movie_pool.filter(movie_pool.country_mask("US"))
+
+    return movie_pool
+
+
+
+def obtain_movie_pool(export_date, dificulty, tmdb_client, export_store, pool_size=50, language=None, rng=None):
+    """
+    Obtiene el export diario de IDs de películas de TMDb de una fecha y los detalles de las películas elegidas.
+
+    Args:
+        export_date (datetime.date): La fecha del export diario de IDs de películas.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        tmdb_client (popcorn.tmdb.TMDbClient): El cliente de la API de TMDb.
+        export_store (popcorn.export_store.ExportStore): El almacén del export diario de IDs.
+        pool_size (int): Número de películas que se eligen del tramo de popularidad.
+        language (str): El idioma de los títulos y resúmenes. Por defecto, el principal del cliente.
+        rng (numpy.random.Generator): El generador con el que se eligen las películas (por ejemplo,
+                                      SamplingEngine.stream("pool")). Opcional.
+
+    Returns:
+        tuple: El conjunto de películas (MoviePool) con los detalles de las películas elegidas y
+               el índice (EligibilityIndex) de las películas válidas para cada tipo de pregunta.
+    """
+
+    # Leer el índice de popularidad del export (construido una sola vez por export y guardado en disco)
+    rng = rng or default_rng()
+    popularity_index = export_store.popularity_index(export_date)
+
+    # Filtrar por dificultad las películas según popularidad
+    if dificulty in popularity_index.bands:
+        with telemetry.timer("index_sample"):
+            selected_movies = popularity_index.sample(dificulty, pool_size, rng)
+    else:
+        print("Algo ha ido mal. La dificultad debería ser un número entre 1 y 4.")
+
+    # Obtener en paralelo los detalles de las películas seleccionadas
+    records = fetch_movie_records(selected_movies, tmdb_client, language)
+    if not records:
+        raise ValueError("No se ha podido descargar ninguna película. Comprueba la conexión con TMDb.")
+    movie_pool = build_movie_pool(records, dificulty)
+    eligibility = EligibilityIndex(movie_pool)
+
+    # Completar las películas desde el mismo tramo de popularidad mientras falte alguna válida para algún tipo de pregunta
+    while eligibility.missing():
+        remaining_movies = np.setdiff1d(popularity_index.band(dificulty), selected_movies)
+        if len(remaining_movies) == 0:
+            raise ValueError(f"No hay suficientes películas para las preguntas {', '.join(eligibility.missing())}.")
+        extra_movies = rng.choice(remaining_movies, size=min(25, len(remaining_movies)), replace=False)
+        selected_movies = np.concatenate([selected_movies, extra_movies])
+        extra_records = fetch_movie_records(extra_movies, tmdb_client, language)
+
+        # Si no se ha podido descargar ninguna (por ejemplo, sin conexión con TMDb), seguir probando con el
+        # resto del tramo sólo acumularía reintentos durante minutos
+        if not extra_records:
+            raise ValueError(
+                f"No se ha podido descargar ninguna película más para las preguntas {', '.join(eligibility.missing())}. "
+                "Comprueba la conexión con TMDb."
+            )
+        records += extra_records
+        movie_pool = build_movie_pool(records, dificulty)
+        eligibility = EligibilityIndex(movie_pool)
+
+    return movie_pool, eligibility
@@ -0,0 +1,189 @@
+# Procesado en paralelo (varios procesos) del export diario de IDs para construir el índice de popularidad
+
+import argparse
+import datetime as dt
+import gzip
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from popcorn import config, telemetry
+from popcorn.export import parse_export_lines
+from popcorn.popularity import RANKED_DTYPE, PopularityIndex, top_k
+
+# Trozos en los que se reparte el export por cada proceso, para equilibrar la carga entre ellos
+CHUNKS_PER_WORKER = 4
+
+
+
+def line_chunks(data, chunks):
+
+    """
+    Divide un export descomprimido en trozos de tamaño parecido que empiezan y terminan en un
+    salto de línea, para que cada proceso decodifique líneas completas.
+
+    Args:
+        data (bytes): El export descomprimido.
+        chunks (int): El número de trozos deseado.
+
+    Returns:
+        list: Las posiciones (inicio, fin) de cada trozo, en orden.
+    """
+
+    size = len(data)
+    bounds = [0]
+    for i in range(1, chunks):
+        newline = data.find(b"\n", max(bounds[-1], size * i // chunks))
+        if newline == -1:
+            break
+        bounds.append(newline + 1)
+    bounds.append(size)
+
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+
+def parse_chunk(name, start, end, top_n):
+
+    """
+    Decodifica en un proceso del pool un trozo del export guardado en memoria compartida.
+
+    Args:
+        name (str): El nombre del bloque de memoria compartida con el export descomprimido.
+        start (int): La posición de inicio del trozo.
+        end (int): La posición de fin del trozo.
+        top_n (int): Número de películas más populares del trozo que se devuelven ya ordenadas. Opcional.
+
+    Returns:
+        tuple: Los IDs y la popularidad del trozo (en bytes, como array.array) y su ranking
+               (RANKED_DTYPE), o None si no se ha pedido.
+    """
+
+    shared = SharedMemory(name=name)
+    try:
+        chunk = bytes(shared.buf[start:end])
+    finally:
+        shared.close()
+    ids, popularity = parse_export_lines(chunk.split(b"\n"))
+    ranked = top_k(ids, popularity, top_n) if top_n else None
+
+    return ids.tobytes(), popularity.tobytes(), ranked
+
+
+
+def parse_export_parallel(fileobj, workers=None, top_n=None):
+
+    """
+    Descomprime una sola vez un export de IDs y decodifica sus líneas en paralelo en un pool de
+    procesos, repartiéndolo en trozos alineados a las líneas a través de memoria compartida.
+
+    El resultado es idéntico al de parse_export_lines: los IDs y la popularidad quedan en el mismo
+    orden que en el export y, si se pide el ranking, se obtiene uniendo los rankings de cada trozo
+    (toda película del ranking global está en el ranking de su trozo) con el mismo desempate por ID.
+
+    Args:
+        fileobj (file-like): La respuesta HTTP (o un fichero) con el export comprimido con gzip.
+        workers (int): Número de procesos. Por defecto, uno por núcleo.
+        top_n (int): Número de posiciones del ranking de popularidad a construir. Opcional.
+
+    Returns:
+        tuple: Dos arrays compactos (array.array) con los IDs y la popularidad de cada película, y
+               el ranking (RANKED_DTYPE) de las top_n más populares, o None si no se ha pedido.
+    """
+
+    workers = workers or os.cpu_count() or 1
+
+    # Descargar y descomprimir el export de una vez
+    start = time.perf_counter()
+    compressed = fileobj.read()
+    downloaded = time.perf_counter()
+    data = gzip.decompress(compressed)
+    del compressed
+    decompressed = time.perf_counter()
+
+    # Copiar el export a memoria compartida y decodificar cada trozo en un proceso
+    ids = array("q")
+    popularity = array("d")
+    rankings = []
+    shared = SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        shared.buf[:len(data)] = data
+        chunks = line_chunks(data, workers * CHUNKS_PER_WORKER)
+        del data
+        # Arrancar los procesos desde cero (spawn) en todos los sistemas, ya que el juego y el
+        # servidor tienen otros hilos en marcha y copiarlos con fork no es seguro
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(parse_chunk, shared.name, chunk_start, chunk_end, top_n) for chunk_start, chunk_end in chunks]
+            for future in futures:
+                chunk_ids, chunk_popularity, ranked = future.result()
+                ids.frombytes(chunk_ids)
+                popularity.frombytes(chunk_popularity)
+                if ranked is not None:
+                    rankings.append(ranked)
+    finally:
+        shared.close()
+        shared.unlink()
+
+    # Unir los rankings de cada trozo en el ranking global
+    ranked = None
+    if top_n:
+        candidates = np.concatenate(rankings) if rankings else np.empty(0, dtype=RANKED_DTYPE)
+        ranked = top_k(candidates["id"], candidates["popularity"], top_n)
+
+    telemetry.observe("export_download", downloaded - start)
+    telemetry.observe("export_decompress", decompressed - downloaded)
+    telemetry.observe("export_parse", time.perf_counter() - decompressed)
+
+    return ids, popularity, ranked
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Construye en paralelo el índice de popularidad del export diario de TMDb.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--date", type=dt.date.fromisoformat, help="Fecha del export (AAAA-MM-DD). Por defecto, la de hace una semana.")
+    source.add_argument("--file", help="Export ya descargado (.json.gz) del que construir el índice.")
+    parser.add_argument("--output", help="Fichero .npy en el que guardar el índice construido desde --file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Número de procesos.")
+    parser.add_argument("--top-n", type=int, help="Posiciones del ranking. Por defecto, las necesarias para todas las dificultades.")
+    parser.add_argument("--verify", action="store_true", help="Comprobar que el resultado es idéntico al del procesado en un solo hilo (sólo con --file).")
+    args = parser.parse_args()
+    if args.verify and not args.file:
+        parser.error("--verify sólo se puede usar con --file.")
+    top_n = args.top_n or max(end for start, end in config.difficulty_bands.values())
+
+    # Construir el índice de un fichero local, o poner al día el del almacén de exports que usa el juego
+    start = time.perf_counter()
+    if args.file:
+        with open(args.file, "rb") as f:
+            ids, popularity, ranked = parse_export_parallel(f, args.workers, top_n)
+        index = PopularityIndex(ranked)
+        if args.output:
+            index.save(args.output)
+    else:
+        from popcorn.export_store import ExportStore
+        export_store = ExportStore(workers=args.workers)
+        with export_store.locked():
+            index = export_store.popularity_index(args.date or dt.date.today() - dt.timedelta(days=7), top_n)
+            ids, popularity = export_store.read_index()
+    print(f"Índice de {len(index)} posiciones construido a partir de {len(ids)} películas en {time.perf_counter() - start:.2f} s con {args.workers} procesos.")
+
+    # Comparar con el procesado en un solo hilo
+    if args.verify:
+        from popcorn.export import parse_export_stream
+        with open(args.file, "rb") as f:
+            expected_ids, expected_popularity = parse_export_stream(f)
+        identical = (
+            expected_ids == ids and expected_popularity == popularity
+            and np.array_equal(top_k(expected_ids, expected_popularity, top_n), index.ranked)
+        )
+        print("Resultado idéntico al del procesado en un solo hilo." if identical else "¡El resultado no coincide con el del procesado en un solo hilo!")
+        if not identical:
+            sys.exit(1)
@@ -0,0 +1,213 @@
+# Conjunto de películas de una partida, guardado por columnas en arrays compactos
+
+import numpy as np
+
+from popcorn.sampling import default_rng
+
+
+
+def intern(values, vocabulary, codes):
+
+    """
+    Convierte una lista de cadenas en códigos enteros, añadiendo al vocabulario las que no estén.
+
+    Args:
+        values (iterable): Las cadenas a convertir.
+        vocabulary (list): Las cadenas ya conocidas, en el orden de su código.
+        codes (dict): El código de cada cadena conocida.
+
+    Returns:
+        list: El código de cada cadena.
+    """
+
+    result = []
+    for value in values:
+        if value not in codes:
+            codes[value] = len(vocabulary)
+            vocabulary.append(value)
+        result.append(codes[value])
+
+    return result
+
+
+
+class MoviePool:
+
+    """
+    Películas con las que se juega una partida, guardadas por columnas: arrays de NumPy con tipo
+    fijo para los datos numéricos, códigos enteros para los países y los géneros (con sus nombres
+    guardados una sola vez) y arrays de objetos para los textos.
+
+    Los años de lanzamiento desconocidos se guardan como 0 y los países desconocidos como -1. Los
+    géneros de cada película se guardan en formato CSR: los de la película i son
+    genre_codes[genre_offsets[i]:genre_offsets[i+1]].
+    """
+
+    __slots__ = [
+        "ids", "titles", "overviews", "poster_urls", "release_years", "budgets", "revenues", "runtimes",
+        "country_codes", "country_names", "genre_offsets", "genre_codes", "genre_names"
+    ]
+
+    def __init__(self, ids, titles, overviews, poster_urls, release_years, budgets, revenues, runtimes,
+                 country_codes, country_names, genre_offsets, genre_codes, genre_names):
+        self.ids = ids
+        self.titles = titles
+        self.overviews = overviews
+        self.poster_urls = poster_urls
+        self.release_years = release_years
+        self.budgets = budgets
+        self.revenues = revenues
+        self.runtimes = runtimes
+        self.country_codes = country_codes
+        self.country_names = country_names
+        self.genre_offsets = genre_offsets
+        self.genre_codes = genre_codes
+        self.genre_names = genre_names
+
+    @classmethod
+    def from_records(cls, records):
+
+        """
+        Construye el conjunto de películas de una sola vez a partir de sus detalles.
+
+        Args:
+            records (list): Los detalles de cada película, tal y como los devuelve
+                            popcorn.movies.parse_movie_details.
+
+        Returns:
+            MoviePool: El conjunto de películas.
+        """
+
+        country_names, country_index = [], {}
+        genre_names, genre_index = [], {}
+        genre_lengths = []
+        genre_codes = []
+        for record in records:
+            genre_codes.extend(intern(record["genres"], genre_names, genre_index))
+            genre_lengths.append(len(record["genres"]))
+        country_codes = [
+            intern([record["origin_country"]], country_names, country_index)[0] if record["origin_country"] else -1
+            for record in records
+        ]
+
+        def text_column(name):
+            column = np.empty(len(records), dtype=object)
+            column[:] = [record[name] for record in records]
+            return column
+
+        return cls(
+            ids=np.array([record["id"] for record in records], dtype=np.int64),
+            titles=text_column("title"),
+            overviews=text_column("overview"),
+            poster_urls=text_column("poster_url"),
+            release_years=np.array([record["release_date"] or 0 for record in records], dtype=np.int16),
+            budgets=np.array([record["budget"] or 0 for record in records], dtype=np.int64),
+            revenues=np.array([record["revenue"] or 0 for record in records], dtype=np.int64),
+            runtimes=np.array([record["runtime"] or 0 for record in records], dtype=np.int16),
+            country_codes=np.array(country_codes, dtype=np.int16),
+            country_names=country_names,
+            genre_offsets=np.concatenate([[0], np.cumsum(genre_lengths, dtype=np.int32)]).astype(np.int32),
+            genre_codes=np.array(genre_codes, dtype=np.int16),
+            genre_names=genre_names
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def genres(self, position):
+
+        """
+        Devuelve los nombres de los géneros de una película.
+
+        Args:
+            position (int): La posición de la película en el conjunto.
+
+        Returns:
+            list: Los nombres de sus géneros.
+        """
+
+        codes = self.genre_codes[self.genre_offsets[position]:self.genre_offsets[position + 1]]
+
+        return [self.genre_names[code] for code in codes]
+
+    def genre_counts(self):
+
+        """
+        Devuelve el número de géneros de cada película.
+
+        Returns:
+            numpy.ndarray: El número de géneros de cada película.
+        """
+
+        return np.diff(self.genre_offsets)
+
+    def country_mask(self, country):
+
+        """
+        Marca las películas de un país de origen.
+
+        Args:
+            country (str): El código ISO del país (por ejemplo, "US").
+
+        Returns:
+            numpy.ndarray: Un array booleano con las películas de ese país.
+        """
+
+        if country not in self.country_names:
+            return np.zeros(len(self), dtype=bool)
+
+        return self.country_codes == self.country_names.index(country)
+
+    def filter(self, selection):
+
+        """
+        Devuelve un nuevo conjunto sólo con las películas seleccionadas.
+
+        Args:
+            selection (numpy.ndarray): Un array booleano o un array de posiciones.
+
+        Returns:
+            MoviePool: El conjunto filtrado (los vocabularios de países y géneros se comparten).
+        """
+
+        positions = np.flatnonzero(selection) if np.asarray(selection).dtype == bool else np.asarray(selection, dtype=np.intp)
+
+        # Recortar los géneros en formato CSR sin recorrer las películas una a una
+        starts = self.genre_offsets[:-1][positions]
+        lengths = self.genre_offsets[1:][positions] - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+        genre_positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return MoviePool(
+            ids=self.ids[positions],
+            titles=self.titles[positions],
+            overviews=self.overviews[positions],
+            poster_urls=self.poster_urls[positions],
+            release_years=self.release_years[positions],
+            budgets=self.budgets[positions],
+            revenues=self.revenues[positions],
+            runtimes=self.runtimes[positions],
+            country_codes=self.country_codes[positions],
+            country_names=self.country_names,
+            genre_offsets=offsets,
+            genre_codes=self.genre_codes[genre_positions],
+            genre_names=self.genre_names
+        )
+
+    def sample(self, k, rng=None):
+
+        """
+        Elige al azar, sin repetición, posiciones de películas del conjunto.
+
+        Args:
+            k (int): El número de películas a elegir.
+            rng (numpy.random.Generator): El generador de números aleatorios. Opcional.
+
+        Returns:
+            numpy.ndarray: Las posiciones de las películas elegidas.
+        """
+
+        if rng is None:
+            rng = default_rng()
+
+        return rng.choice(len(self), size=min(k, len(self)), replace=False)
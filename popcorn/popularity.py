@@ -0,0 +1,261 @@
+# Índice de popularidad con las películas mejor posicionadas de cada export
+
+import numpy as np
+
+from popcorn import config
+from popcorn.sampling import default_rng
+
+# Estructura de cada posición del ranking: ID de la película y su popularidad
+RANKED_DTYPE = np.dtype([("id", "<i8"), ("popularity", "<f8")])
+
+
+
+def top_k(ids, popularity, k):
+
+    """
+    Selecciona las k películas más populares sin ordenar el export completo.
+
+    Primero se hace una selección parcial (argpartition) y sólo se ordenan las elegidas, de más a
+    menos populares y, a igualdad de popularidad, por ID ascendente, de modo que el resultado no
+    depende del orden de las películas en el export.
+
+    Args:
+        ids (array-like): Los IDs de las películas.
+        popularity (array-like): La popularidad de cada película.
+        k (int): El número de películas a seleccionar.
+
+    Returns:
+        numpy.ndarray: Un array estructurado (RANKED_DTYPE) con las k películas más populares, ordenadas.
+    """
+
+    ids = np.asarray(ids, dtype=np.int64)
+    popularity = np.asarray(popularity, dtype=np.float64)
+
+    # Quedarse con las que superan el umbral de la k-ésima (incluidos los empates con ella)
+    if k < len(popularity):
+        threshold = popularity[np.argpartition(popularity, len(popularity) - k)[len(popularity) - k]]
+        candidates = np.flatnonzero(popularity >= threshold)
+    else:
+        candidates = np.arange(len(popularity))
+
+    order = np.lexsort((ids[candidates], -popularity[candidates]))[:k]
+    ranked = np.empty(len(order), dtype=RANKED_DTYPE)
+    ranked["id"] = ids[candidates[order]]
+    ranked["popularity"] = popularity[candidates[order]]
+
+    return ranked
+
+
+
+def diff_exports(old_ids, old_popularity, new_ids, new_popularity):
+
+    """
+    Compara dos exports y devuelve sólo las películas que han cambiado entre ellos.
+
+    Args:
+        old_ids (array-like): Los IDs de las películas del export anterior.
+        old_popularity (array-like): La popularidad de cada película del export anterior.
+        new_ids (array-like): Los IDs de las películas del export nuevo.
+        new_popularity (array-like): La popularidad de cada película del export nuevo.
+
+    Returns:
+        tuple: Los IDs de las películas que ya no aparecen, y los IDs y la nueva popularidad de
+               las películas nuevas o cuya popularidad ha cambiado.
+    """
+
+    old_ids = np.asarray(old_ids, dtype=np.int64)
+    old_popularity = np.asarray(old_popularity, dtype=np.float64)
+    new_ids = np.asarray(new_ids, dtype=np.int64)
+    new_popularity = np.asarray(new_popularity, dtype=np.float64)
+
+    # Si el export conserva el mismo orden de películas basta con comparar las popularidades
+    if np.array_equal(old_ids, new_ids):
+        changed = np.flatnonzero(old_popularity != new_popularity)
+        return np.empty(0, dtype=np.int64), new_ids[changed], new_popularity[changed]
+
+    # Si no, emparejar las películas de ambos exports por ID
+    _, old_positions, new_positions = np.intersect1d(old_ids, new_ids, return_indices=True)
+    removed = np.ones(len(old_ids), dtype=bool)
+    removed[old_positions] = False
+    changed = np.ones(len(new_ids), dtype=bool)
+    changed[new_positions] = old_popularity[old_positions] != new_popularity[new_positions]
+
+    return old_ids[removed], new_ids[changed], new_popularity[changed]
+
+
+
+def update_top_k(ranked, removed_ids, changed_ids, changed_popularity, k, exhaustive=False):
+
+    """
+    Actualiza un ranking con los cambios entre dos exports sin volver a recorrer el export completo.
+
+    Las películas del ranking que no han cambiado conservan su orden relativo, y las que quedaban
+    fuera de él y tampoco han cambiado no pueden superar a la última del ranking anterior, de modo
+    que basta con reordenar el ranking junto con las películas cambiadas que la superan. Cada
+    película del ranking que baja por detrás de esa última deja un hueco que sólo se puede cubrir
+    volviendo al export completo, por lo que conviene guardar más posiciones de las necesarias.
+
+    Args:
+        ranked (numpy.ndarray): El ranking anterior (RANKED_DTYPE), ordenado.
+        removed_ids (array-like): Los IDs de las películas que ya no aparecen en el export.
+        changed_ids (array-like): Los IDs de las películas nuevas o cuya popularidad ha cambiado.
+        changed_popularity (array-like): La nueva popularidad de esas películas.
+        k (int): El número mínimo de posiciones que debe tener el ranking actualizado.
+        exhaustive (bool): Si el ranking anterior incluía todas las películas del export.
+
+    Returns:
+        numpy.ndarray: El ranking actualizado (RANKED_DTYPE), con entre k y tantas posiciones como
+                       el anterior e idéntico a las primeras que construiría top_k con el export
+                       nuevo, o None si hay que reconstruirlo desde el export completo.
+    """
+
+    changed_ids = np.asarray(changed_ids, dtype=np.int64)
+    changed_popularity = np.asarray(changed_popularity, dtype=np.float64)
+    touched = np.concatenate([np.asarray(removed_ids, dtype=np.int64), changed_ids])
+    kept = ranked[~np.isin(ranked["id"], touched)]
+
+    candidates = np.empty(len(kept) + len(changed_ids), dtype=RANKED_DTYPE)
+    candidates[:len(kept)] = kept
+    candidates["id"][len(kept):] = changed_ids
+    candidates["popularity"][len(kept):] = changed_popularity
+
+    # Descartar las películas que quedan por detrás de la última del ranking anterior
+    if not exhaustive and len(ranked):
+        last_id, last_popularity = ranked["id"][-1], ranked["popularity"][-1]
+        candidates = candidates[
+            (candidates["popularity"] > last_popularity)
+            | ((candidates["popularity"] == last_popularity) & (candidates["id"] <= last_id))
+        ]
+        if len(candidates) < k:
+            return None
+
+    order = np.lexsort((candidates["id"], -candidates["popularity"]))[:max(k, len(ranked))]
+
+    return candidates[order]
+
+
+
+class PopularityIndex:
+
+    """
+    Ranking de las películas más populares de un export, del que se leen directamente los tramos
+    de cada dificultad.
+
+    Args:
+        ranked (numpy.ndarray): Un array estructurado (RANKED_DTYPE) ordenado de más a menos popular.
+        bands (dict): Los tramos (inicio, fin) del ranking de cada dificultad. Por defecto, los de la configuración.
+    """
+
+    def __init__(self, ranked, bands=None):
+        self.ranked = ranked
+        self.bands = dict(bands if bands is not None else config.difficulty_bands)
+
+    @classmethod
+    def build(cls, ids, popularity, top_n=None, bands=None):
+
+        """
+        Construye el índice a partir de los IDs y la popularidad de un export.
+
+        Args:
+            ids (array-like): Los IDs de las películas.
+            popularity (array-like): La popularidad de cada película.
+            top_n (int): Número de posiciones del ranking que se guardan. Por defecto, las
+                         necesarias para cubrir todos los tramos.
+            bands (dict): Los tramos (inicio, fin) del ranking de cada dificultad.
+
+        Returns:
+            PopularityIndex: El índice construido.
+        """
+
+        bands = dict(bands if bands is not None else config.difficulty_bands)
+        if top_n is None:
+            top_n = max(end for start, end in bands.values())
+
+        return cls(top_k(ids, popularity, top_n), bands)
+
+    @classmethod
+    def load(cls, path, bands=None):
+
+        """
+        Abre un índice guardado en disco, proyectándolo en memoria (memory-map) sin leerlo entero.
+
+        Args:
+            path (str): La ruta del fichero .npy del índice.
+            bands (dict): Los tramos (inicio, fin) del ranking de cada dificultad.
+
+        Returns:
+            PopularityIndex: El índice guardado.
+        """
+
+        return cls(np.load(path, mmap_mode="r"), bands)
+
+    def save(self, path):
+
+        """
+        Guarda el índice en disco en formato .npy.
+
+        Args:
+            path (str): La ruta del fichero .npy del índice.
+
+        Returns:
+            None
+        """
+
+        with open(path, "wb") as f:
+            np.save(f, np.asarray(self.ranked, dtype=RANKED_DTYPE))
+
+    def __len__(self):
+        return len(self.ranked)
+
+    @property
+    def ranked_ids(self):
+        return self.ranked["id"]
+
+    def members(self):
+
+        """
+        Devuelve los IDs de todas las películas que aparecen en el tramo de alguna dificultad.
+
+        Returns:
+            numpy.ndarray: Los IDs, ordenados y sin repetir.
+        """
+
+        return np.unique(np.concatenate([self.band(band) for band in self.bands.values()]))
+
+    def band(self, dificulty):
+
+        """
+        Devuelve los IDs del tramo de popularidad de una dificultad, o de un tramo personalizado.
+
+        Args:
+            dificulty (int | tuple): El nivel de dificultad, o un tramo (inicio, fin) del ranking.
+
+        Returns:
+            numpy.ndarray: Los IDs del tramo, ordenados de más a menos populares.
+        """
+
+        start, end = dificulty if isinstance(dificulty, tuple) else self.bands[dificulty]
+        if end > len(self.ranked):
+            raise ValueError(f"El tramo {start}-{end} supera las {len(self.ranked)} posiciones guardadas en el índice.")
+
+        return self.ranked["id"][start:end]
+
+    def sample(self, dificulty, k, rng=None):
+
+        """
+        Elige al azar, sin repetición, películas del tramo de popularidad de una dificultad.
+
+        Args:
+            dificulty (int | tuple): El nivel de dificultad, o un tramo (inicio, fin) del ranking.
+            k (int): El número de películas a elegir.
+            rng (numpy.random.Generator): El generador de números aleatorios. Opcional.
+
+        Returns:
+            numpy.ndarray: Los IDs de las películas elegidas.
+        """
+
+        if rng is None:
+            rng = default_rng()
+        band = self.band(dificulty)
+
+        return band[rng.choice(len(band), size=min(k, len(band)), replace=False)]
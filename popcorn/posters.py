@@ -0,0 +1,250 @@
+# Descarga, caché y recorte de los pósters de las películas
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+from popcorn import config, telemetry
+
+
+
+def build_poster_url(poster_path, size=None):
+
+    """
+    Construye la URL de un póster de TMDb con el tamaño indicado.
+
+    Args:
+        poster_path (str): La ruta del póster que devuelve la API (por ejemplo, "/abc.jpg").
+        size (str): El tamaño del póster en TMDb (por ejemplo, "w500"). Por defecto, el de la configuración.
+
+    Returns:
+        str: La URL del póster, o None si la película no tiene póster.
+    """
+
+    if not poster_path:
+        return None
+
+    return f"{config.tmdb_image_url}/{size or config.poster_size}{poster_path}"
+
+
+
+def crop_box(width, height, dificulty):
+
+    """
+    Calcula el recuadro central del póster que se muestra en función de la dificultad.
+
+    Args:
+        width (int): El ancho del póster.
+        height (int): El alto del póster.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        tuple: Las coordenadas (izquierda, arriba, derecha, abajo) del recorte.
+    """
+
+    # Calcular el tamaño del recorte en función de la dificultad y sus coordenadas desde el centro
+    crop_perc = 0.3 / dificulty
+    crop_width = int(width * crop_perc)
+    crop_height = int(height * crop_perc)
+
+    return (
+        (width - crop_width) // 2,
+        (height - crop_height) // 2,
+        (width + crop_width) // 2,
+        (height + crop_height) // 2
+    )
+
+
+
+class PosterService:
+
+    """
+    Servicio de pósters que descarga cada imagen una sola vez y la guarda ya decodificada en una
+    caché LRU en memoria y, comprimida, en una caché en disco. El trozo del póster de la pregunta
+    y el póster completo se obtienen de la misma imagen decodificada.
+
+    Args:
+        directory (str): La carpeta de la caché en disco.
+        memory_items (int): Número máximo de pósters decodificados en memoria.
+        max_disk_bytes (int): Tamaño máximo de la caché en disco, en bytes.
+        max_display (tuple): Tamaño máximo (ancho, alto) con el que se decodifica cada póster.
+    """
+
+    def __init__(self, directory=None, memory_items=config.poster_memory_items,
+                 max_disk_bytes=config.poster_disk_max_bytes, max_display=config.poster_max_display):
+        self.directory = directory or os.path.join(config.cache_dir, "posters")
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.max_display = max_display
+        self.images = OrderedDict()
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def disk_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def fetch_bytes(self, url):
+
+        """
+        Obtiene el fichero comprimido de un póster, desde la caché en disco o descargándolo.
+
+        Args:
+            url (str): La URL del póster.
+
+        Returns:
+            bytes: El contenido del fichero del póster.
+        """
+
+        path = self.disk_path(url)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            telemetry.count("cache_lookups", cache="poster_disk", result="hit")
+            return data
+        except FileNotFoundError:
+            telemetry.count("cache_lookups", cache="poster_disk", result="miss")
+
+        with telemetry.timer("poster_download"):
+            response = self.session.get(url, timeout=config.tmdb_timeout)
+            telemetry.count("http_requests", resource="poster", status=response.status_code)
+            response.raise_for_status()
+            data = response.content
+        telemetry.count("http_bytes", len(data), resource="poster")
+
+        # Guardar el póster en disco y expulsar los menos usados si se supera el tamaño máximo
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict_disk()
+
+        return data
+
+    def evict_disk(self):
+
+        """
+        Borra los pósters de la caché en disco usados hace más tiempo hasta respetar el tamaño máximo.
+
+        Returns:
+            None
+        """
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def discard(self, urls):
+
+        """
+        Borra unos pósters de las cachés en memoria y en disco.
+
+        Args:
+            urls (iterable): Las URLs de los pósters.
+
+        Returns:
+            int: El número de pósters borrados del disco.
+        """
+
+        removed = 0
+        for url in urls:
+            with self.lock:
+                self.images.pop(url, None)
+            try:
+                os.remove(self.disk_path(url))
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def decode(self, data):
+
+        """
+        Decodifica un póster al tamaño justo para mostrarlo, usando la decodificación reducida de
+        JPEG (draft) y Image.reduce en lugar de decodificar y luego redimensionar.
+
+        Args:
+            data (bytes): El contenido del fichero del póster.
+
+        Returns:
+            PIL.Image.Image: El póster decodificado.
+        """
+
+        with telemetry.timer("poster_decode"):
+            img = Image.open(BytesIO(data))
+            max_width, max_height = self.max_display
+            if img.width > max_width or img.height > max_height:
+                img.draft("RGB", (max_width, max_height))
+            img.load()
+
+            factor = min(img.width // max_width, img.height // max_height)
+            if factor >= 2:
+                img = img.reduce(factor)
+
+            return img
+
+    def get(self, url):
+
+        """
+        Obtiene un póster decodificado, desde la caché en memoria si está disponible.
+
+        Args:
+            url (str): La URL del póster.
+
+        Returns:
+            PIL.Image.Image: El póster completo.
+        """
+
+        with self.lock:
+            if url in self.images:
+                self.images.move_to_end(url)
+                telemetry.count("cache_lookups", cache="poster_memory", result="hit")
+                return self.images[url]
+        telemetry.count("cache_lookups", cache="poster_memory", result="miss")
+
+        img = self.decode(self.fetch_bytes(url))
+
+        with self.lock:
+            self.images[url] = img
+            self.images.move_to_end(url)
+            while len(self.images) > self.memory_items:
+                self.images.popitem(last=False)
+
+        return img
+
+    def crop(self, url, dificulty):
+
+        """
+        Obtiene el trozo central de un póster en función de la dificultad.
+
+        Args:
+            url (str): La URL del póster.
+            dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+        Returns:
+            PIL.Image.Image: El trozo del póster.
+        """
+
+        img = self.get(url)
+
+        with telemetry.timer("poster_crop"):
+            return img.crop(crop_box(img.width, img.height, dificulty))
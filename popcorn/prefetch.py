@@ -0,0 +1,114 @@
+# Preparación en segundo plano de las preguntas mientras el usuario juega
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from popcorn.eligibility import QUESTION_TYPES
+from popcorn.questions import build_question
+
+
+
+class PrefetchScheduler:
+
+    """
+    Prepara en un pool de hilos las preguntas de la partida y descarga sus recursos (los pósters)
+    en cuanto las películas están listas, para que al pasar a la siguiente pregunta no haya que
+    esperar a la red.
+
+    Args:
+        poster_service (popcorn.posters.PosterService): El servicio de pósters en el que se precargan las imágenes.
+        max_workers (int): Número de hilos del pool.
+    """
+
+    def __init__(self, poster_service, max_workers=len(QUESTION_TYPES)):
+        self.poster_service = poster_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.cancelled = threading.Event()
+        self.futures = {}
+        self.errors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cancel()
+
+    def schedule(self, movie_pool, eligibility, dificulty, line_width, question_types=QUESTION_TYPES, sampling=None):
+
+        """
+        Lanza en segundo plano la preparación de las preguntas de la partida.
+
+        Args:
+            movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+            eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+            dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+            line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+            question_types (list): Los tipos de pregunta a preparar.
+            sampling (popcorn.sampling.SamplingEngine): Los sorteos de la partida. Opcional.
+
+        Returns:
+            None
+        """
+
+        # Cada pregunta se sortea con su propio generador, así que el orden de los hilos no cambia el resultado
+        for question_type in question_types:
+            rng = sampling.stream(question_type) if sampling is not None else None
+            self.futures[question_type] = self.executor.submit(
+                self.prepare, question_type, movie_pool, eligibility, dificulty, line_width, rng
+            )
+
+    def prepare(self, question_type, movie_pool, eligibility, dificulty, line_width, rng=None):
+
+        """
+        Prepara una pregunta y precarga los recursos que necesita para mostrarse.
+
+        Returns:
+            dict: La pregunta preparada, o None si la precarga se ha cancelado.
+        """
+
+        if self.cancelled.is_set():
+            return None
+        question = build_question(question_type, movie_pool, eligibility, dificulty, line_width, rng=rng)
+
+        # Descargar y decodificar el póster; si falla, se volverá a intentar al mostrar la pregunta. El error
+        # se avisa entonces desde el hilo principal: escribirlo desde aquí mezclaría el aviso con la respuesta
+        # que el usuario está escribiendo
+        if question.get("poster_url") and not self.cancelled.is_set():
+            try:
+                self.poster_service.get(question["poster_url"])
+            except Exception as e:
+                self.errors[question_type] = e
+
+        return question
+
+    def question(self, question_type):
+
+        """
+        Devuelve una pregunta ya preparada, esperando a que termine su preparación si hace falta, y
+        avisa si no se ha podido precargar su póster.
+
+        Args:
+            question_type (str): El tipo de pregunta.
+
+        Returns:
+            dict: La pregunta preparada.
+        """
+
+        question = self.futures[question_type].result()
+        error = self.errors.pop(question_type, None)
+        if error is not None:
+            print(f"No se ha podido precargar el póster de '{question['title']}' ({error}), se volverá a intentar al mostrarlo.")
+
+        return question
+
+    def cancel(self):
+
+        """
+        Cancela las preparaciones pendientes y libera el pool de hilos sin esperar a las que están en curso.
+
+        Returns:
+            None
+        """
+
+        self.cancelled.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,338 @@
+# Banco de preguntas precalculadas, para servir partidas sin red y casi sin CPU
+
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+if __name__ == "__main__":
+    # Cargar las variables de entorno desde el archivo .env (antes de leer la configuración)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from popcorn import config
+from popcorn.cache import DetailsCache
+from popcorn.eligibility import QUESTION_TYPES
+from popcorn.export_store import ExportStore
+from popcorn.masking import mask_overviews
+from popcorn.movies import obtain_movie_pool
+from popcorn.posters import PosterService
+from popcorn.questions import build_question
+from popcorn.sampling import SamplingEngine, default_rng
+from popcorn.tmdb import TMDbClient
+
+# Versión del formato del banco: si cambia, los bancos anteriores se regeneran desde cero
+BANK_FORMAT = 1
+
+# Estructura de cada entrada del índice: tipo de pregunta y posición de su línea en questions.jsonl
+INDEX_DTYPE = np.dtype([("type", "i1"), ("offset", "<i8"), ("length", "<i4")])
+
+
+
+def bank_directory(dificulty, root=None):
+    return os.path.join(root or os.path.join(config.cache_dir, "bank"), f"d{dificulty}")
+
+
+
+class BankPosters:
+
+    """
+    Pósters y recortes guardados en el banco, con la misma interfaz que PosterService (get y crop)
+    para que las preguntas del cartel se muestren igual que con el servicio de pósters.
+
+    Args:
+        bank (QuestionBank): El banco de preguntas.
+    """
+
+    def __init__(self, bank):
+        self.bank = bank
+
+    def get(self, url):
+        offset, length = self.bank.manifest["images"][url]["poster"]
+        return Image.open(BytesIO(self.bank.read("images.bin", offset, length)))
+
+    def crop(self, url, dificulty):
+        offset, length = self.bank.manifest["images"][url]["crop"]
+        return Image.open(BytesIO(self.bank.read("images.bin", offset, length)))
+
+
+
+class QuestionBank:
+
+    """
+    Banco de preguntas ya preparadas de una dificultad. Cada versión del banco se guarda en su
+    propia carpeta con tres ficheros: questions.jsonl (una pregunta por línea), index.npy (la
+    posición de cada línea, proyectado en memoria) e images.bin (los pósters y sus recortes,
+    uno detrás de otro). manifest.json indica la versión vigente.
+
+    Args:
+        directory (str): La carpeta del banco de la dificultad.
+        manifest (dict): El manifiesto de la versión vigente.
+        sampling (popcorn.sampling.SamplingEngine): Los sorteos de la partida. Opcional.
+    """
+
+    def __init__(self, directory, manifest, sampling=None):
+        self.directory = directory
+        self.manifest = manifest
+        self.sampling = sampling
+        self.version_directory = os.path.join(directory, f"v{manifest['version']}")
+        self.index = np.load(os.path.join(self.version_directory, "index.npy"), mmap_mode="r")
+        self.files = {name: open(os.path.join(self.version_directory, name), "rb") for name in ["questions.jsonl", "images.bin"]}
+        self.lock = threading.Lock()
+        self.positions = {
+            question_type: np.flatnonzero(self.index["type"] == code)
+            for code, question_type in enumerate(QUESTION_TYPES)
+        }
+        self.posters = BankPosters(self)
+
+    @classmethod
+    def open(cls, dificulty, root=None, line_width=None, sampling=None):
+
+        """
+        Abre el banco de preguntas de una dificultad, si está generado.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+            root (str): La carpeta de los bancos. Por defecto, la de la caché.
+            line_width (int): Si se indica, sólo se abre el banco generado con esa longitud de línea.
+            sampling (popcorn.sampling.SamplingEngine): Los sorteos de la partida. Opcional.
+
+        Returns:
+            QuestionBank: El banco, o None si no hay ninguno compatible.
+        """
+
+        directory = bank_directory(dificulty, root)
+        try:
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if manifest.get("format") != BANK_FORMAT or (line_width is not None and manifest["line_width"] != line_width):
+            return None
+
+        return cls(directory, manifest, sampling)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, name, offset, length):
+        with self.lock:
+            f = self.files[name]
+            f.seek(offset)
+            return f.read(length)
+
+    def entry(self, position):
+        record = self.index[position]
+        return json.loads(self.read("questions.jsonl", int(record["offset"]), int(record["length"])))
+
+    def entries(self):
+        for position in range(len(self.index)):
+            yield self.entry(position)
+
+    def question(self, question_type, rng=None):
+
+        """
+        Saca al azar una pregunta del banco.
+
+        Args:
+            question_type (str): El tipo de pregunta.
+            rng (numpy.random.Generator): El generador de números aleatorios. Por defecto, el del
+                                          tipo de pregunta en los sorteos de la partida.
+
+        Returns:
+            dict: La pregunta, con el mismo formato que las de popcorn.questions.build_question.
+        """
+
+        positions = self.positions[question_type]
+        if len(positions) == 0:
+            raise ValueError(f"El banco no tiene preguntas de tipo '{question_type}'.")
+
+        if rng is None:
+            rng = self.sampling.stream(question_type) if self.sampling is not None else default_rng()
+
+        return self.entry(int(positions[rng.integers(len(positions))]))
+
+
+
+def render_images(url, dificulty, poster_service):
+
+    """
+    Descarga un póster y prepara su recorte para la pregunta del cartel.
+
+    Args:
+        url (str): La URL del póster.
+        dificulty (int): El nivel de dificultad, que marca el tamaño del recorte.
+        poster_service (popcorn.posters.PosterService): El servicio de pósters.
+
+    Returns:
+        tuple: El fichero del póster tal y como se descarga y el recorte en JPEG.
+    """
+
+    poster = poster_service.fetch_bytes(url)
+    buffer = BytesIO()
+    poster_service.crop(url, dificulty).convert("RGB").save(buffer, format="JPEG", quality=90)
+
+    return poster, buffer.getvalue()
+
+
+
+def build_bank(movie_pool, eligibility, dificulty, poster_service, per_type=config.question_bank_size,
+               line_width=80, root=None, rng=None):
+
+    """
+    Genera el banco de preguntas de una dificultad o lo actualiza con un conjunto de películas
+    nuevo: se conservan las preguntas cuyas películas siguen en el conjunto y sólo se generan (y
+    se descargan los pósters de) las que faltan. El resultado se publica como una versión nueva,
+    de modo que las partidas que estén usando la anterior no se ven afectadas.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas con las que se generan las preguntas.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        dificulty (int): El nivel de dificultad.
+        poster_service (popcorn.posters.PosterService): El servicio de pósters.
+        per_type (int): Número de preguntas de cada tipo.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        root (str): La carpeta de los bancos. Por defecto, la de la caché.
+        rng (numpy.random.Generator): El generador con el que se sortean las preguntas nuevas. Opcional.
+
+    Returns:
+        dict: La versión publicada y el número de preguntas conservadas y generadas.
+    """
+
+    directory = bank_directory(dificulty, root)
+    os.makedirs(directory, exist_ok=True)
+    pool_ids = set(movie_pool.ids.tolist())
+    questions = {question_type: [] for question_type in QUESTION_TYPES}
+    images = {}
+
+    # Conservar las preguntas (y las imágenes) del banco anterior cuyas películas siguen en el conjunto
+    previous = QuestionBank.open(dificulty, root, line_width)
+    version = 1
+    if previous is not None:
+        with previous:
+            version = previous.manifest["version"] + 1
+            for question in previous.entries():
+                if set(question["movie_ids"]) <= pool_ids and len(questions[question["type"]]) < per_type:
+                    questions[question["type"]].append(question)
+                    url = question.get("poster_url")
+                    if url and url not in images:
+                        images[url] = tuple(previous.read("images.bin", *previous.manifest["images"][url][kind]) for kind in ["poster", "crop"])
+    kept = sum(len(entries) for entries in questions.values())
+
+    # Generar las preguntas que faltan de cada tipo, con los resúmenes formateados y enmascarados de una vez
+    overview_texts = mask_overviews(movie_pool.overviews, line_width, dificulty)
+    for question_type in QUESTION_TYPES:
+        while len(questions[question_type]) < per_type:
+            questions[question_type].append(build_question(question_type, movie_pool, eligibility, dificulty, line_width, overview_texts, rng))
+
+    # Descargar en paralelo los pósters nuevos y preparar sus recortes. Las preguntas de los pósters que
+    # fallan se descartan y se sortean otras en su lugar, mientras quede algún póster sin probar
+    failed = set()
+    poster_urls = {movie_pool.poster_urls[position] for position in eligibility.candidates["poster_piece"]}
+    with ThreadPoolExecutor(max_workers=config.tmdb_concurrency, thread_name_prefix="bank") as executor:
+        while True:
+            new_urls = sorted({question["poster_url"] for question in questions["poster_piece"]} - images.keys())
+            if not new_urls:
+                break
+            futures = [(url, executor.submit(render_images, url, dificulty, poster_service)) for url in new_urls]
+            for url, future in futures:
+                try:
+                    images[url] = future.result()
+                except Exception as e:
+                    failed.add(url)
+                    print(f"No se ha podido preparar el póster {url}, se descartan sus preguntas: {e}")
+            questions["poster_piece"] = [question for question in questions["poster_piece"] if question["poster_url"] not in failed]
+            while len(questions["poster_piece"]) < per_type and poster_urls - failed:
+                question = build_question("poster_piece", movie_pool, eligibility, dificulty, line_width, overview_texts, rng)
+                if question["poster_url"] not in failed:
+                    questions["poster_piece"].append(question)
+    if not questions["poster_piece"]:
+        raise ValueError("No se ha podido preparar ningún póster: se conserva la versión anterior del banco.")
+    generated = sum(len(entries) for entries in questions.values()) - kept
+
+    # Escribir la versión nueva en su propia carpeta
+    version_directory = os.path.join(directory, f"v{version}")
+    shutil.rmtree(version_directory, ignore_errors=True)
+    os.makedirs(version_directory)
+    index = np.empty(sum(len(entries) for entries in questions.values()), dtype=INDEX_DTYPE)
+    position = offset = 0
+    with open(os.path.join(version_directory, "questions.jsonl"), "wb") as f:
+        for code, question_type in enumerate(QUESTION_TYPES):
+            for question in questions[question_type]:
+                line = (json.dumps(question, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                index[position] = (code, offset, len(line))
+                position += 1
+                offset += len(line)
+    with open(os.path.join(version_directory, "index.npy"), "wb") as f:
+        np.save(f, index)
+    locations = {}
+    offset = 0
+    with open(os.path.join(version_directory, "images.bin"), "wb") as f:
+        for url, (poster, crop) in images.items():
+            f.write(poster)
+            f.write(crop)
+            locations[url] = {"poster": [offset, len(poster)], "crop": [offset + len(poster), len(crop)]}
+            offset += len(poster) + len(crop)
+
+    # Publicar la versión nueva y borrar las anteriores
+    manifest = {
+        "format": BANK_FORMAT,
+        "version": version,
+        "dificulty": dificulty,
+        "line_width": line_width,
+        "created_at": time.time(),
+        "pool_ids": sorted(pool_ids),
+        "counts": {question_type: len(entries) for question_type, entries in questions.items()},
+        "images": locations
+    }
+    tmp_path = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, "manifest.json"))
+    for entry in os.scandir(directory):
+        if entry.is_dir() and entry.name != f"v{version}":
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    return {"version": version, "kept": kept, "generated": generated}
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Genera los bancos de preguntas de Popcorn Quiz.")
+    parser.add_argument("--dificulty", type=int, action="append", help="Dificultad a generar (por defecto, todas).")
+    parser.add_argument("--per-type", type=int, default=config.question_bank_size, help="Preguntas de cada tipo.")
+    parser.add_argument("--pool-size", type=int, default=config.server_pool_size, help="Películas con las que se generan las preguntas.")
+    parser.add_argument("--seed", type=int, help="Semilla de los sorteos, para generar de nuevo exactamente los mismos bancos.")
+    args = parser.parse_args()
+
+    # Generar el banco de cada dificultad con un conjunto de películas actualizado a una semana atrás
+    one_week_ago = dt.date.today() - dt.timedelta(days=7)
+    sampling = SamplingEngine(args.seed)
+    with TMDbClient(os.getenv("TMDB_API_KEY"), cache=DetailsCache()) as tmdb_client:
+        export_store = ExportStore()
+        poster_service = PosterService()
+        for dificulty in args.dificulty or sorted(config.difficulty_bands):
+            movie_pool, eligibility = obtain_movie_pool(one_week_ago, dificulty, tmdb_client, export_store, args.pool_size, rng=sampling.stream(f"pool:{dificulty}"))
+            result = build_bank(movie_pool, eligibility, dificulty, poster_service, args.per_type, rng=sampling.stream(f"bank:{dificulty}"))
+            print(f"Dificultad {dificulty}: versión {result['version']}, {result['kept']} preguntas conservadas y {result['generated']} nuevas.")
+    print(f"Semilla de los sorteos: {sampling.seed}")
@@ -0,0 +1,443 @@
+# Preguntas del juego: preparación de cada pregunta y su presentación al usuario
+
+import datetime as dt
+import re
+import textwrap
+
+from popcorn import config, telemetry
+from popcorn.masking import wrap_and_mask
+from popcorn.sampling import default_rng, sample_positions, shuffled
+
+
+
+def validate_answer():
+
+    """
+    Valida la respuesta del usuario asegurándose de que sea un número entre 1 y 4.
+
+    Returns:
+        int: La respuesta validada del usuario.
+    """
+
+    # Instanciar un bucle while que sólo se rompe cuando la respuesta es un número entre 1 y 4
+    valid_answer = False
+    while valid_answer == False:
+        answer = input("\nIntroduce un número entre 1 y 4 para tu respuesta: ")
+        if re.match(r"^\d$", answer):
+            answer = int(answer)
+            if answer in range(1, 5):
+                valid_answer = True
+            else:
+                print(f"\n¡{answer} no es un número del 1 al 4!")
+        else:
+            print(f"\n¡{answer} no es un número del 1 al 4!")
+
+    return answer
+
+
+
+def is_answer_correct(question, answer):
+
+    """
+    Comprueba si la respuesta del usuario a una pregunta ya preparada es correcta.
+
+    Args:
+        question (dict): La pregunta preparada.
+        answer (int): La respuesta del usuario (entre 1 y 4).
+
+    Returns:
+        bool: True si la respuesta es correcta, False en caso contrario.
+    """
+
+    return question["options"][answer-1] == question["options"][question["answer"]]
+
+
+
+def points_per_question(dificulty):
+
+    """
+    Calcula cuántos puntos vale cada acierto en un nivel de dificultad.
+
+    Args:
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+
+    Returns:
+        float: Los puntos de cada pregunta acertada.
+    """
+
+    return 1 + (dificulty - 1) / 3
+
+
+
+def build_release_date_question(movie_pool, eligibility, dificulty, rng=None):
+
+    """
+    Prepara una pregunta sobre el año de lanzamiento de una película.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        rng (numpy.random.Generator): El generador de números aleatorios de la pregunta. Opcional.
+
+    Returns:
+        dict: La pregunta, con el título de la película, su año de lanzamiento, los cuatro años
+              que se ofrecen como opciones, la posición del correcto y el ID de la película.
+    """
+
+    # Elegir aleatoriamente una película con año de lanzamiento como la respuesta correcta
+    rng = rng or default_rng()
+    correct = eligibility.draw_one("release_date", rng)
+    correct_answer_title = movie_pool.titles[correct]
+    correct_answer_release_date = int(movie_pool.release_years[correct])
+
+    # Tramo de años, no superiores al actual ni iguales al correcto, en función del nivel de dificultad
+    current_year = dt.datetime.today().year
+    first_year = correct_answer_release_date - int(64/dificulty**2)
+    last_year = min(correct_answer_release_date + int(64/dificulty**2), current_year + 1)
+
+    # Elegir tres años del tramo sin construir la lista de años, añadir el correcto y desordenarlos
+    decoys = sample_positions(rng, last_year - first_year, 3, exclude=correct_answer_release_date - first_year)
+    options_years = shuffled(rng, [first_year + position for position in decoys] + [correct_answer_release_date])
+
+    return {
+        "type": "release_date",
+        "title": correct_answer_title,
+        "release_date": correct_answer_release_date,
+        "options": options_years,
+        "answer": options_years.index(correct_answer_release_date),
+        "movie_ids": [int(movie_pool.ids[correct])]
+    }
+
+
+
+def build_overview_question(movie_pool, eligibility, line_width, dificulty, overview_texts=None, rng=None):
+
+    """
+    Prepara una pregunta sobre el resumen de una película.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        overview_texts (tuple): Los resúmenes de todas las películas ya formateados y enmascarados
+                                (popcorn.masking.mask_overviews). Opcional.
+        rng (numpy.random.Generator): El generador de números aleatorios de la pregunta. Opcional.
+
+    Returns:
+        dict: La pregunta, con el título de la película, su resumen completo y enmascarado (ya
+              formateados), los cuatro títulos que se ofrecen como opciones, la posición del correcto
+              y los IDs de las películas de las opciones.
+    """
+
+    # Seleccionar aleatoriamente cuatro opciones de películas, siendo la correcta una con resumen
+    options, correct = eligibility.draw("overview", rng)
+    correct_answer_title = movie_pool.titles[correct]
+
+    # Formatear el resumen y enmascarar sus vocales con x's (o tomarlos ya preparados)
+    if overview_texts is not None:
+        formatted_overview, formatted_masked_overview = overview_texts[0][correct], overview_texts[1][correct]
+    else:
+        formatted_overview, formatted_masked_overview = wrap_and_mask(movie_pool.overviews[correct], line_width, dificulty)
+
+    return {
+        "type": "overview",
+        "title": correct_answer_title,
+        "overview": formatted_overview,
+        "masked_overview": formatted_masked_overview,
+        "options": movie_pool.titles[options].tolist(),
+        "answer": options.index(correct),
+        "movie_ids": movie_pool.ids[options].tolist()
+    }
+
+
+
+def build_details_question(movie_pool, eligibility, line_width, rng=None):
+
+    """
+    Prepara una pregunta sobre los detalles de producción de una película.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        rng (numpy.random.Generator): El generador de números aleatorios de la pregunta. Opcional.
+
+    Returns:
+        dict: La pregunta, con el título de la película, el enunciado con sus detalles (ya
+              formateado), los cuatro títulos que se ofrecen como opciones, la posición del correcto
+              y los IDs de las películas de las opciones.
+    """
+
+    # Seleccionar aleatoriamente cuatro opciones de películas, siendo la correcta una con todos los detalles técnicos
+    options, correct = eligibility.draw("details", rng)
+
+    # Extraer los detalles de la respuesta correcta
+    correct_answer_title = movie_pool.titles[correct]
+    correct_answer_genres = ", ".join(movie_pool.genres(correct))
+    correct_answer_release = int(movie_pool.release_years[correct])
+    correct_answer_budget = int(movie_pool.budgets[correct])
+    correct_answer_revenue = int(movie_pool.revenues[correct])
+    correct_answer_runtime = int(movie_pool.runtimes[correct])
+
+    # Redactar el enunciado con los detalles de la película
+    correct_answer_details = f""
+    correct_answer_details += f"¿Cuál de las siguientes 4 películas se estrenó el {correct_answer_release}, "
+    if (correct_answer_budget > 0) & (correct_answer_revenue > 0):
+        correct_answer_details += f"con un presupuesto de {correct_answer_budget:,}$ y una recaudación de {correct_answer_revenue:,}$, que "
+    correct_answer_details += f"podría enmarcarse dentro de {correct_answer_genres}, "
+    correct_answer_details += f"y tiene una duración de {correct_answer_runtime} min?"
+    formatted_details = textwrap.fill(correct_answer_details, width=line_width)
+
+    return {
+        "type": "details",
+        "title": correct_answer_title,
+        "details": formatted_details,
+        "options": movie_pool.titles[options].tolist(),
+        "answer": options.index(correct),
+        "movie_ids": movie_pool.ids[options].tolist()
+    }
+
+
+
+def build_poster_piece_question(movie_pool, eligibility, dificulty, rng=None):
+
+    """
+    Prepara una pregunta sobre un trozo de póster de película.
+
+    Args:
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        rng (numpy.random.Generator): El generador de números aleatorios de la pregunta. Opcional.
+
+    Returns:
+        dict: La pregunta, con el título de la película, la URL de su póster, la dificultad (que
+              marca el tamaño del trozo), los cuatro títulos que se ofrecen como opciones, la
+              posición del correcto y los IDs de las películas de las opciones.
+    """
+
+    # Seleccionar aleatoriamente cuatro opciones de películas, siendo la correcta una con póster
+    options, correct = eligibility.draw("poster_piece", rng)
+
+    return {
+        "type": "poster_piece",
+        "title": movie_pool.titles[correct],
+        "poster_url": movie_pool.poster_urls[correct],
+        "dificulty": dificulty,
+        "options": movie_pool.titles[options].tolist(),
+        "answer": options.index(correct),
+        "movie_ids": movie_pool.ids[options].tolist()
+    }
+
+
+
+def build_question(question_type, movie_pool, eligibility, dificulty, line_width, overview_texts=None, rng=None):
+
+    """
+    Prepara una pregunta del tipo indicado.
+
+    Args:
+        question_type (str): El tipo de pregunta ("release_date", "overview", "details" o "poster_piece").
+        movie_pool (popcorn.pool.MoviePool): Las películas de la partida.
+        eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        overview_texts (tuple): Los resúmenes ya formateados y enmascarados, para la pregunta del resumen. Opcional.
+        rng (numpy.random.Generator): El generador de números aleatorios de la pregunta (por ejemplo,
+                                      SamplingEngine.stream(question_type)). Opcional.
+
+    Returns:
+        dict: La pregunta preparada.
+    """
+
+    with telemetry.timer("question_build", type=question_type):
+        if question_type == "release_date":
+            return build_release_date_question(movie_pool, eligibility, dificulty, rng)
+        elif question_type == "overview":
+            return build_overview_question(movie_pool, eligibility, line_width, dificulty, overview_texts, rng)
+        elif question_type == "details":
+            return build_details_question(movie_pool, eligibility, line_width, rng)
+        elif question_type == "poster_piece":
+            return build_poster_piece_question(movie_pool, eligibility, dificulty, rng)
+        else:
+            raise ValueError(f"Tipo de pregunta desconocido: {question_type}")
+
+
+
+def question_release_date(question):
+
+    """
+    Muestra una pregunta sobre el año de lanzamiento de una película y valida la respuesta del usuario.
+
+    Args:
+        question (dict): La pregunta preparada por build_release_date_question.
+
+    Returns:
+        bool: True si la respuesta es correcta, False en caso contrario.
+    """
+
+    correct_answer_title = question["title"]
+    correct_answer_release_date = question["release_date"]
+
+    # Mostrar al usuario la pregunta
+    print("\nEL LANZAMIENTO OFICIAL\n")
+    print(f"¿En qué año se estrenó '{correct_answer_title}'?")
+    for i, year in enumerate(question["options"]):
+        print(f"{i+1}. {year}")
+
+    # Validar la respuesta del usuario y comprobar si es correcta
+    answer = validate_answer()
+
+    # Mostrar mensaje de respuesta correcta/incorrecta
+    if is_answer_correct(question, answer):
+        print(f"\n¡¡¡CORRECTO!!! Efectivamente, '{correct_answer_title}' se estrenó en el año {correct_answer_release_date}.\n")
+        return True
+    else:
+        print(f"\nIncorrecto... '{correct_answer_title}' no se estrenó en el año {question['options'][answer-1]}, sino en el {correct_answer_release_date}.\n")
+        return False
+
+
+
+def question_overview(question):
+
+    """
+    Muestra una pregunta sobre el resumen de una película y valida la respuesta del usuario.
+
+    Args:
+        question (dict): La pregunta preparada por build_overview_question.
+
+    Returns:
+        bool: True si la respuesta es correcta, False en caso contrario.
+    """
+
+    correct_answer_title = question["title"]
+
+    # Mostrar al usuario la pregunta y el resumen enmascarado
+    print("\nEL RESUMEN ENMASCARADO\n")
+    print(("¿A cuál de las siguientes 4 películas corresponde el siguiente resumen incompleto?\n\n"
+        f"{question['masked_overview']}\n"))
+    for i, title in enumerate(question["options"]):
+        print(f"{i+1}. {title}")
+
+    # Validar la respuesta del usuario y comprobar si es correcta
+    answer = validate_answer()
+
+    # Mostrar mensaje de respuesta correcta/incorrecta y el resumen completo
+    if is_answer_correct(question, answer):
+        print((f"\n¡¡¡CORRECTO!!! Efectivamente, se trata del resumen de '{correct_answer_title}'.\n\n"
+            f"Míralo completo:\n\n{question['overview']}\n"))
+        return True
+    else:
+        print((f"\nIncorrecto... Se trata del resumen de '{correct_answer_title}'.\n\n"
+            f"Míralo completo:\n\n{question['overview']}\n"))
+        return False
+
+
+
+def question_details(question):
+
+    """
+    Muestra una pregunta sobre los detalles de una película y valida la respuesta del usuario.
+
+    Args:
+        question (dict): La pregunta preparada por build_details_question.
+
+    Returns:
+        bool: True si la respuesta es correcta, False en caso contrario.
+    """
+
+    correct_answer_title = question["title"]
+
+    # Mostrar al usuario la pregunta con los detalles de la película
+    print("\nDETALLES DE PRODUCCIÓN\n")
+    print(question["details"])
+
+    # Muestra las opciones
+    for i, title in enumerate(question["options"]):
+        print(f"{i+1}. {title}")
+
+    # Validar la respuesta del usuario y comprobar si es correcta
+    answer = validate_answer()
+
+    # Mostrar mensaje de respuesta correcta/incorrecta
+    if is_answer_correct(question, answer):
+        print(f"\n¡¡¡CORRECTO!!! Efectivamente, se trata de '{correct_answer_title}'.\n\n")
+        return True
+    else:
+        print(f"\nIncorrecto... Se trata de '{correct_answer_title}'.\n\n")
+        return False
+
+
+
+def get_poster_part(poster_service, url_poster, dificulty, display=None):
+
+    """
+    Obtiene y muestra una parte central del póster de la película desde la URL dada.
+
+    Args:
+        poster_service (popcorn.posters.PosterService): El servicio de pósters.
+        url_poster (str): La URL del póster de la película.
+        dificulty (int): El nivel de dificultad del juego elegido por el usuario.
+        display (popcorn.display.PosterDisplay): Dónde se muestra la imagen. Por defecto, el de la configuración.
+
+    Returns:
+        None
+    """
+
+    # Importado aquí para no cargar NumPy (que usan los modos de presentación) al arrancar el juego
+    from popcorn.display import get_default_display
+    display = display or get_default_display()
+
+    # Recortar la imagen (descargada y decodificada una sola vez por el servicio de pósters) y mostrarla
+    display.show(display.prepare(lambda: poster_service.crop(url_poster, dificulty), "recorte"), config.poster_display_timeout)
+
+    return None
+
+
+
+def question_poster_piece(question, poster_service, display=None):
+
+    """
+    Muestra una pregunta sobre un trozo de póster de película y valida la respuesta del usuario.
+
+    Args:
+        question (dict): La pregunta preparada por build_poster_piece_question.
+        poster_service (popcorn.posters.PosterService): El servicio de pósters.
+        display (popcorn.display.PosterDisplay): Dónde se muestran las imágenes. Por defecto, el de la configuración.
+
+    Returns:
+        bool: True si la respuesta es correcta, False en caso contrario.
+    """
+
+    correct_answer_title = question["title"]
+    from popcorn.display import get_default_display
+    display = display or get_default_display()
+
+    # Preparar en segundo plano el recorte y el póster completo mientras se muestra la pregunta
+    crop = display.prepare(lambda: poster_service.crop(question["poster_url"], question["dificulty"]), "recorte")
+    full = display.prepare(lambda: poster_service.get(question["poster_url"]), "cartel")
+
+    # Mostrar al usuario la pregunta y el trozo del póster
+    print("\nEL CARTEL ROTO\n")
+    print("¿A cuál de las siguientes 4 películas corresponde el siguiente trozo de cartel?")
+    for i, title in enumerate(question["options"]):
+        print(f"{i+1}. {title}")
+
+    # Esperar al recorte un tiempo limitado: si no llega (por ejemplo, sin conexión), se responde igualmente
+    display.show(crop, config.poster_display_timeout)
+
+    # Validar la respuesta del usuario y comprobar si es correcta
+    answer = validate_answer()
+
+    # Mostrar la imagen completa, que ya se ha preparado mientras el usuario respondía
+    display.show(full, config.poster_display_timeout)
+
+    # Mostrar mensaje de respuesta correcta/incorrecta y el póster completo
+    if is_answer_correct(question, answer):
+        print(f"\n¡¡¡CORRECTO!!! Efectivamente, se trata del cartel de '{correct_answer_title}'.\n")
+        return True
+    else:
+        print(f"\nIncorrecto... Se trata del cartel de '{correct_answer_title}'.\n")
+        return False
@@ -0,0 +1,86 @@
+# Registros compactos de películas: sólo los campos del juego, con el título y el resumen en varios idiomas
+
+# Campos de los detalles de una película que usa el juego y que no dependen del idioma
+SHARED_FIELDS = ["id", "origin_country", "release_date", "budget", "revenue", "runtime", "poster_path"]
+
+
+
+def find_translation(translations, language):
+
+    """
+    Busca la traducción de un idioma entre las que devuelve append_to_response=translations.
+
+    Args:
+        translations (list): Las traducciones de la película, tal y como las devuelve la API.
+        language (str): El idioma, con o sin región (por ejemplo, "en" o "en-US").
+
+    Returns:
+        dict: Los datos de la traducción (título, resumen...), o None si no hay ninguna de ese idioma.
+    """
+
+    code = language.split("-")[0]
+    exact = [t for t in translations if f"{t.get('iso_639_1')}-{t.get('iso_3166_1')}" == language]
+    candidates = exact or [t for t in translations if t.get("iso_639_1") == code]
+
+    return (candidates[0].get("data") or {}) if candidates else None
+
+
+
+def project_movie(movie, language, languages):
+
+    """
+    Reduce los detalles de una película que devuelve la API a un registro compacto con los campos
+    que usa el juego, y reúne en él el título y el resumen de cada idioma.
+
+    Args:
+        movie (dict): Los detalles de la película tal y como los devuelve la API, pedidos en el
+                      idioma principal y, si hay más idiomas, con append_to_response=translations.
+        language (str): El idioma principal en el que se han pedido los detalles.
+        languages (list): Los idiomas que se guardan en el registro.
+
+    Returns:
+        dict: El registro compacto: los campos comunes, los nombres de los géneros (en el idioma
+              principal), los títulos y resúmenes de cada idioma ("titles", "overviews") y los
+              idiomas pedidos ("languages").
+    """
+
+    record = {field: movie.get(field) for field in SHARED_FIELDS}
+    record["genres"] = [genre["name"] for genre in movie.get("genres") or []]
+    record["titles"] = {language: movie.get("title")}
+    record["overviews"] = {language: movie.get("overview") or ""}
+
+    # Completar los demás idiomas con las traducciones; TMDb deja el título vacío si no se traduce
+    translations = (movie.get("translations") or {}).get("translations") or []
+    for other in languages:
+        if other == language:
+            continue
+        translation = find_translation(translations, other)
+        if translation is not None:
+            record["titles"][other] = translation.get("title") or movie.get("original_title") or movie.get("title")
+            record["overviews"][other] = translation.get("overview") or ""
+    record["languages"] = list(dict.fromkeys([language, *languages]))
+
+    return record
+
+
+
+def localize(record, language):
+
+    """
+    Obtiene el título y el resumen de una película en un idioma a partir de su registro compacto.
+
+    Args:
+        record (dict): El registro compacto de la película.
+        language (str): El idioma, con o sin región.
+
+    Returns:
+        tuple: El título y el resumen. Si la película no tiene traducción a ese idioma se usa el
+               título del idioma principal y el resumen queda vacío.
+    """
+
+    code = language.split("-")[0]
+    key = language if language in record["titles"] else next((other for other in record["titles"] if other.split("-")[0] == code), None)
+    if key is None:
+        return record["titles"][record["languages"][0]], ""
+
+    return record["titles"][key], record["overviews"].get(key, "")
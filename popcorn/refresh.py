@@ -0,0 +1,93 @@
+# Actualización incremental en segundo plano del índice de popularidad entre exports diarios
+
+import datetime as dt
+import threading
+
+from popcorn import config
+from popcorn.posters import build_poster_url
+
+
+
+class IndexRefresher:
+
+    """
+    Mantiene al día el índice de popularidad de un despliegue que no se reinicia: cada cierto
+    tiempo aplica al índice guardado los cambios del export nuevo y borra de las cachés sólo los
+    detalles y los pósters de las películas que han salido de los tramos de todas las dificultades.
+
+    Las partidas en curso no se ven afectadas, ya que trabajan con sus propios conjuntos de
+    películas en memoria, y las siguientes leen ya el índice actualizado.
+
+    Args:
+        export_store (popcorn.export_store.ExportStore): El almacén del export diario de IDs.
+        details_cache (popcorn.cache.DetailsCache): La caché de detalles de películas. Opcional.
+        poster_service (popcorn.posters.PosterService): El servicio de pósters. Opcional.
+        interval (float): Segundos entre actualizaciones.
+    """
+
+    def __init__(self, export_store, details_cache=None, poster_service=None, interval=config.index_refresh_interval):
+        self.export_store = export_store
+        self.details_cache = details_cache
+        self.poster_service = poster_service
+        self.interval = interval
+        self.last_delta = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self, date=None):
+
+        """
+        Actualiza el índice con el export de una fecha e invalida lo que ha dejado de usarse.
+
+        Args:
+            date (datetime.date): La fecha del export. Por defecto, la de hace una semana (la que usa el juego).
+
+        Returns:
+            dict: Los últimos cambios aplicados (ver ExportStore.refresh), o None si el export no ha cambiado.
+        """
+
+        if date is None:
+            date = dt.date.today() - dt.timedelta(days=7)
+        self.export_store.refresh(date)
+
+        # Recoger también los cambios de export que se hayan aplicado al preparar partidas entre dos
+        # actualizaciones (por ejemplo, al renovar los conjuntos de películas del servidor)
+        deltas = self.export_store.pop_deltas()
+        for delta in deltas:
+            # Invalidar los detalles y los pósters de las películas que ya no pueden salir en ninguna partida
+            dropped = delta["dropped"].tolist()
+            deleted = self.details_cache.delete_many(dropped) if self.details_cache is not None else []
+            if self.poster_service is not None:
+                self.poster_service.discard(url for url in (build_poster_url(movie.get("poster_path")) for movie in deleted) if url)
+
+            print(
+                f"Índice de popularidad actualizado al export del {delta['date']}: {delta['changed']} películas cambiadas, "
+                f"{delta['removed']} desaparecidas y {len(dropped)} fuera de los tramos de dificultad"
+                f"{'' if delta['incremental'] else ' (reconstruido desde el export completo)'}."
+            )
+            self.last_delta = delta
+
+        return deltas[-1] if deltas else None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.refresh_loop, name="index-refresh", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def refresh_loop(self):
+
+        """
+        Actualiza el índice cada interval segundos. Si una actualización falla, se sigue usando el
+        índice anterior hasta la siguiente.
+
+        Returns:
+            None
+        """
+
+        while not self.stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"No se ha podido actualizar el índice de popularidad: {e}")
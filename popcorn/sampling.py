@@ -0,0 +1,156 @@
+# Motor de sorteos de cada partida: generadores de números aleatorios con semilla, para poder repetir una partida
+
+import datetime as dt
+import hashlib
+import secrets
+import zlib
+
+
+
+def sample_positions(rng, n, k, exclude=None):
+
+    """
+    Elige al azar, sin repetición, k posiciones entre 0 y n - 1 (saltándose una si se indica),
+    con el algoritmo de Floyd: el coste es O(k), sin construir ni copiar la lista de posiciones.
+
+    Args:
+        rng (numpy.random.Generator): El generador de números aleatorios.
+        n (int): El número de posiciones.
+        k (int): El número de posiciones a elegir.
+        exclude (int): Una posición que no se puede elegir (por ejemplo, la respuesta correcta). Opcional.
+
+    Returns:
+        list: Las posiciones elegidas (en un orden que no es aleatorio: hay que desordenarlas si importa).
+    """
+
+    available = n - (exclude is not None and 0 <= exclude < n)
+    if not 0 <= k <= available:
+        raise ValueError(f"No se pueden elegir {k} posiciones distintas entre {available}.")
+
+    # Un único sorteo de k números uniformes: el j-ésimo se escala a una posición entre 0 y j
+    chosen = set()
+    positions = []
+    for j, uniform in zip(range(available - k, available), rng.random(k).tolist()):
+        position = int(uniform * (j + 1))
+        if position in chosen:
+            position = j
+        chosen.add(position)
+        positions.append(position)
+
+    if exclude is not None:
+        positions = [position + (position >= exclude) for position in positions]
+
+    return positions
+
+
+
+def shuffled(rng, items):
+
+    """
+    Devuelve una copia desordenada de una lista (Fisher-Yates, con un único sorteo para las listas
+    cortas de opciones, más rápido que rng.permutation).
+
+    Args:
+        rng (numpy.random.Generator): El generador de números aleatorios.
+        items (list): Los elementos.
+
+    Returns:
+        list: Los mismos elementos en un orden aleatorio.
+    """
+
+    items = list(items)
+    for i, uniform in zip(range(len(items) - 1, 0, -1), rng.random(max(len(items) - 1, 0)).tolist()):
+        j = int(uniform * (i + 1))
+        items[i], items[j] = items[j], items[i]
+
+    return items
+
+
+
+def daily_seed(dificulty, date=None):
+
+    """
+    Calcula la semilla del reto diario: la misma para todos los jugadores de una dificultad en un día.
+
+    Args:
+        dificulty (int): El nivel de dificultad.
+        date (datetime.date): El día del reto. Por defecto, hoy.
+
+    Returns:
+        int: La semilla.
+    """
+
+    date = date or dt.date.today()
+    digest = hashlib.sha256(f"popcorn-daily:{date.isoformat()}:{dificulty}".encode("ascii")).digest()
+
+    return int.from_bytes(digest[:8], "little")
+
+
+
+class SamplingEngine:
+
+    """
+    Sorteos de una partida a partir de una única semilla. Cada etapa (el conjunto de películas,
+    cada tipo de pregunta...) tiene su propio generador, derivado de la semilla y del nombre de la
+    etapa, de forma que el resultado de cada una no depende del orden ni del hilo en que se hagan
+    las demás. Con la misma semilla y el mismo export, una partida se repite exactamente.
+
+    Args:
+        seed (int): La semilla. Por defecto, una nueva al azar (se puede consultar en self.seed).
+    """
+
+    def __init__(self, seed=None):
+        self.seed = secrets.randbits(64) if seed is None else int(seed)
+        if self.seed < 0:
+            raise ValueError("La semilla debe ser un entero no negativo.")
+        self.generators = {}
+
+    @classmethod
+    def daily(cls, dificulty, date=None):
+
+        """
+        Crea el motor del reto diario, con el que todos los jugadores reciben las mismas preguntas.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+            date (datetime.date): El día del reto. Por defecto, hoy.
+
+        Returns:
+            SamplingEngine: El motor con la semilla del día.
+        """
+
+        return cls(daily_seed(dificulty, date))
+
+    def stream(self, name):
+
+        """
+        Devuelve el generador de una etapa de la partida (siempre el mismo para el mismo nombre).
+
+        Args:
+            name (str): El nombre de la etapa (por ejemplo, "pool" o un tipo de pregunta).
+
+        Returns:
+            numpy.random.Generator: El generador de la etapa.
+        """
+
+        if name not in self.generators:
+            import numpy as np
+            sequence = np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(name.encode("utf-8")),))
+            self.generators[name] = np.random.default_rng(sequence)
+
+        return self.generators[name]
+
+
+
+# Generador de los sorteos sin semilla (cuando no se indica ninguno), creado la primera vez que se usa:
+# este módulo se importa al arrancar el juego y NumPy no hace falta hasta preparar las preguntas
+default_generator = None
+
+
+
+def default_rng():
+    global default_generator
+    if default_generator is None:
+        import numpy as np
+        default_generator = np.random.default_rng()
+    return default_generator
@@ -0,0 +1,252 @@
+# Modo servidor: el juego como API HTTP para muchos jugadores a la vez
+
+import argparse
+import os
+from io import BytesIO
+
+from flask import Flask, Response, jsonify, request, send_file, url_for
+
+if __name__ == "__main__":
+    # Cargar las variables de entorno desde el archivo .env (antes de leer la configuración)
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from popcorn import config, telemetry
+from popcorn.cache import DetailsCache
+from popcorn.export_store import ExportStore
+from popcorn.leaderboard import Leaderboard
+from popcorn.posters import PosterService
+from popcorn.refresh import IndexRefresher
+from popcorn.sessions import PoolRegistry, SessionStore
+from popcorn.tmdb import TMDbClient
+
+# Títulos de cada tipo de pregunta, los mismos que se muestran en la terminal
+QUESTION_HEADINGS = {
+    "release_date": "EL LANZAMIENTO OFICIAL",
+    "overview": "EL RESUMEN ENMASCARADO",
+    "details": "DETALLES DE PRODUCCIÓN",
+    "poster_piece": "EL CARTEL ROTO"
+}
+
+
+
+def public_question(session):
+
+    """
+    Prepara la pregunta actual de una partida para enviarla al jugador, sin la respuesta.
+
+    Args:
+        session (popcorn.sessions.GameSession): La partida.
+
+    Returns:
+        dict: El tipo, el título y el enunciado de la pregunta y sus opciones.
+    """
+
+    question = session.current
+    public = {
+        "number": len(session.answers) + 1,
+        "type": question["type"],
+        "heading": QUESTION_HEADINGS[question["type"]],
+        "options": question["options"]
+    }
+
+    # Añadir el enunciado de cada tipo de pregunta
+    if question["type"] == "release_date":
+        public["prompt"] = f"¿En qué año se estrenó '{question['title']}'?"
+    elif question["type"] == "overview":
+        public["prompt"] = "¿A cuál de las siguientes 4 películas corresponde el siguiente resumen incompleto?"
+        public["text"] = question["masked_overview"]
+    elif question["type"] == "details":
+        public["prompt"] = question["details"]
+    elif question["type"] == "poster_piece":
+        public["prompt"] = "¿A cuál de las siguientes 4 películas corresponde el siguiente trozo de cartel?"
+        public["image_url"] = url_for("poster_piece", game_id=session.id)
+
+    return public
+
+
+
+def game_state(session):
+
+    """
+    Resume el estado de una partida para enviarlo al jugador.
+
+    Args:
+        session (popcorn.sessions.GameSession): La partida.
+
+    Returns:
+        dict: El identificador, el jugador, la dificultad, los aciertos, si es el reto diario, la
+              semilla de sus sorteos y la pregunta actual o, si la partida ha terminado, los
+              puntos conseguidos.
+    """
+
+    state = {
+        "game_id": session.id,
+        "player": session.player,
+        "dificulty": session.dificulty,
+        "answered": len(session.answers),
+        "correct": session.counter,
+        "finished": session.finished,
+        "daily": session.daily,
+        "seed": session.seed
+    }
+    if session.finished:
+        state["points"] = session.points
+    else:
+        state["question"] = public_question(session)
+
+    return state
+
+
+
+def error(status, message):
+    return jsonify({"error": message}), status
+
+
+
+def create_app(registry, sessions=None, leaderboard=None):
+
+    """
+    Crea la aplicación Flask con las rutas del juego.
+
+    Args:
+        registry (popcorn.sessions.PoolRegistry): Los conjuntos de películas compartidos, ya cargados.
+        sessions (popcorn.sessions.SessionStore): Las partidas en curso. Por defecto, un almacén vacío.
+        leaderboard (popcorn.leaderboard.Leaderboard): El ranking en el que se guardan las partidas terminadas. Opcional.
+
+    Returns:
+        flask.Flask: La aplicación.
+    """
+
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    if sessions is None:
+        sessions = SessionStore(registry)
+
+    @app.after_request
+    def count_request(response):
+        telemetry.count("server_requests", endpoint=request.endpoint, status=response.status_code)
+        return response
+
+    @app.get("/metrics")
+    def metrics():
+        if not telemetry.enabled:
+            return error(404, "La telemetría está desactivada (POPCORN_TELEMETRY=1 para activarla).")
+        return Response(telemetry.prometheus_text(), mimetype="text/plain; version=0.0.4")
+
+    @app.get("/health")
+    def health():
+        return jsonify({
+            "games": len(sessions),
+            "pools": {dificulty: len(movie_pool) for dificulty, (movie_pool, _) in registry.pools.items()},
+            "refreshed_at": registry.refreshed_at
+        })
+
+    @app.post("/games")
+    def new_game():
+        payload = request.get_json(silent=True) or {}
+        player = str(payload.get("player", "")).strip()
+        dificulty = payload.get("dificulty")
+        daily = bool(payload.get("daily", False))
+        seed = payload.get("seed")
+        if not player:
+            return error(400, "Falta el nombre del jugador.")
+        if isinstance(dificulty, bool) or dificulty not in registry.pools:
+            return error(400, f"La dificultad debe ser uno de {sorted(config.difficulty_bands)}.")
+        if seed is not None and (daily or not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+            return error(400, "La semilla debe ser un entero no negativo, y no se puede usar en el reto diario.")
+        try:
+            session = sessions.create(player, dificulty, daily, seed)
+        except OverflowError as e:
+            return error(503, str(e))
+        return jsonify(game_state(session)), 201
+
+    @app.get("/games/<game_id>")
+    def get_game(game_id):
+        session = sessions.get(game_id)
+        if session is None:
+            return error(404, "La partida no existe o ha caducado.")
+        return jsonify(game_state(session))
+
+    @app.post("/games/<game_id>/answers")
+    def answer(game_id):
+        session = sessions.get(game_id)
+        if session is None:
+            return error(404, "La partida no existe o ha caducado.")
+        answer = (request.get_json(silent=True) or {}).get("answer")
+        if not isinstance(answer, int) or isinstance(answer, bool) or answer not in range(1, 5):
+            return error(400, "La respuesta debe ser un número entre 1 y 4.")
+        try:
+            question, correct = session.answer(answer)
+        except ValueError as e:
+            return error(409, str(e))
+
+        # Revelar la respuesta correcta junto al nuevo estado de la partida
+        result = {
+            "correct": correct,
+            "solution": question["answer"] + 1,
+            "title": question["title"]
+        }
+        if question["type"] == "overview":
+            result["overview"] = question["overview"]
+        elif question["type"] == "poster_piece":
+            result["poster_url"] = question["poster_url"]
+
+        # Guardar la puntuación en el ranking al terminar la partida
+        state = game_state(session)
+        if session.finished and leaderboard is not None:
+            state["rank"] = leaderboard.add(session.player, session.dificulty, config.difficulty_labels[session.dificulty], session.points)
+
+        return jsonify({"result": result, **state})
+
+    @app.get("/leaderboard")
+    def get_leaderboard():
+        if leaderboard is None:
+            return error(404, "El ranking no está disponible.")
+        dificulty = request.args.get("dificulty", type=int)
+        if "dificulty" in request.args and dificulty not in config.difficulty_bands:
+            return error(400, f"La dificultad debe ser uno de {sorted(config.difficulty_bands)}.")
+        n = max(1, min(request.args.get("n", default=leaderboard.top_n, type=int), 100))
+        return jsonify(leaderboard.top(n, dificulty))
+
+    @app.get("/games/<game_id>/poster")
+    def poster_piece(game_id):
+        session = sessions.get(game_id)
+        if session is None:
+            return error(404, "La partida no existe o ha caducado.")
+        question = session.current
+        if question is None or question["type"] != "poster_piece":
+            return error(409, "La pregunta actual no es la del cartel.")
+
+        # Recortar el póster (ya descargado al cargar las películas) y enviarlo como JPEG
+        buffer = BytesIO()
+        registry.poster_service.crop(question["poster_url"], question["dificulty"]).convert("RGB").save(buffer, format="JPEG", quality=90)
+        buffer.seek(0)
+        return send_file(buffer, mimetype="image/jpeg", max_age=0)
+
+    return app
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Popcorn Quiz en modo servidor.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=config.server_threads, help="Hilos que atienden peticiones a la vez.")
+    args = parser.parse_args()
+
+    # Cargar las películas de todas las dificultades antes de aceptar partidas
+    tmdb_client = TMDbClient(os.getenv("TMDB_API_KEY"), cache=DetailsCache())
+    export_store = ExportStore()
+    poster_service = PosterService()
+    registry = PoolRegistry(tmdb_client, export_store, poster_service)
+    registry.start()
+
+    # Aplicar en segundo plano los cambios de cada export diario al índice de popularidad
+    IndexRefresher(export_store, tmdb_client.cache, poster_service).start()
+
+    # Un único proceso con hilos, ya que las partidas se guardan en memoria, servido con waitress (un
+    # servidor WSGI para producción, a diferencia del servidor de desarrollo de Flask)
+    from waitress import serve
+    serve(create_app(registry, leaderboard=Leaderboard()), host=args.host, port=args.port, threads=args.threads)
@@ -0,0 +1,451 @@
+# Estado compartido del modo servidor: películas precargadas por dificultad y partidas de cada jugador
+
+import datetime as dt
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from popcorn import config
+from popcorn.eligibility import QUESTION_TYPES
+from popcorn.masking import mask_overviews
+from popcorn.movies import obtain_movie_pool
+from popcorn.questions import build_question, is_answer_correct, points_per_question
+from popcorn.sampling import SamplingEngine
+
+
+
+class PoolRegistry:
+
+    """
+    Conjuntos de películas precargados para cada dificultad y compartidos por todas las partidas,
+    de forma que empezar una partida sólo requiere preparar sus preguntas. Un hilo en segundo plano
+    los renueva periódicamente y sustituye cada conjunto de golpe, sin bloquear las partidas en curso.
+
+    Args:
+        tmdb_client (popcorn.tmdb.TMDbClient): El cliente de la API de TMDb.
+        export_store (popcorn.export_store.ExportStore): El almacén del export diario de IDs.
+        poster_service (popcorn.posters.PosterService): El servicio de pósters en el que se precargan las imágenes.
+        pool_size (int): Número de películas de cada conjunto.
+        refresh_interval (float): Segundos entre renovaciones de los conjuntos.
+    """
+
+    def __init__(self, tmdb_client, export_store, poster_service, pool_size=config.server_pool_size,
+                 refresh_interval=config.server_refresh_interval):
+        self.tmdb_client = tmdb_client
+        self.export_store = export_store
+        self.poster_service = poster_service
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self.pools = {}
+        self.refreshed_at = {}
+        self.daily_pools = {}
+        self.next_daily_pools = {}
+        self.daily_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def load(self, dificulty):
+
+        """
+        Obtiene un conjunto de películas nuevo para una dificultad, descarga sus pósters a la caché
+        en disco y lo publica para las partidas que empiecen a partir de ese momento.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+
+        Returns:
+            None
+        """
+
+        one_week_ago = dt.date.today() - dt.timedelta(days=7)
+        movie_pool, eligibility = obtain_movie_pool(one_week_ago, dificulty, self.tmdb_client, self.export_store, self.pool_size)
+        self.preload_posters(movie_pool, eligibility)
+
+        self.pools[dificulty] = (movie_pool, eligibility)
+        self.refreshed_at[dificulty] = time.time()
+
+    def preload_posters(self, movie_pool, eligibility):
+
+        """
+        Descarga a la caché en disco los pósters de las películas que pueden salir en la pregunta del cartel.
+
+        Args:
+            movie_pool (popcorn.pool.MoviePool): El conjunto de películas.
+            eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+
+        Returns:
+            None
+        """
+
+        poster_urls = [movie_pool.poster_urls[position] for position in eligibility.candidates["poster_piece"]]
+        with ThreadPoolExecutor(max_workers=config.tmdb_concurrency, thread_name_prefix="posters") as executor:
+            for url, future in [(url, executor.submit(self.poster_service.fetch_bytes, url)) for url in poster_urls]:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"No se ha podido precargar el póster {url}: {e}")
+
+    def build_daily(self, dificulty, date):
+
+        """
+        Sortea el conjunto de películas del reto diario de un día: con la semilla de ese día, a partir
+        del export de una semana antes y con config.daily_pool_size películas, igual que el juego con
+        POPCORN_DAILY=1, de modo que es el mismo en cualquier servidor.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+            date (datetime.date): El día del reto.
+
+        Returns:
+            tuple: El día del reto, el conjunto de películas (MoviePool) y su índice de películas
+                   válidas (EligibilityIndex).
+        """
+
+        rng = SamplingEngine.daily(dificulty, date).stream("pool")
+        movie_pool, eligibility = obtain_movie_pool(date - dt.timedelta(days=7), dificulty, self.tmdb_client,
+                                                    self.export_store, config.daily_pool_size, rng=rng)
+        self.preload_posters(movie_pool, eligibility)
+
+        return date, movie_pool, eligibility
+
+    def prepare_daily(self, dificulty):
+
+        """
+        Prepara en el hilo de renovación los conjuntos del reto diario de hoy (si todavía no está) y de
+        mañana, para que al cambiar de día baste con sustituir uno por otro.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+
+        Returns:
+            None
+        """
+
+        today = dt.date.today()
+        if self.daily(dificulty)[0] < today:
+            self.daily_pools[dificulty] = self.build_daily(dificulty, today)
+
+        tomorrow = today + dt.timedelta(days=1)
+        upcoming = self.next_daily_pools.get(dificulty)
+        if upcoming is None or upcoming[0] < tomorrow:
+            self.next_daily_pools[dificulty] = self.build_daily(dificulty, tomorrow)
+
+    def daily(self, dificulty):
+
+        """
+        Devuelve el conjunto de películas del reto diario de una dificultad. Es distinto del que se
+        renueva periódicamente para las demás partidas y nunca se sortea al pedirlo: al cambiar de día
+        se sustituye por el que el hilo de renovación ha preparado para ese día y, mientras no esté
+        listo, se sigue usando el del día anterior.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+
+        Returns:
+            tuple: El día del reto, el conjunto de películas (MoviePool) y su índice de películas
+                   válidas (EligibilityIndex).
+        """
+
+        with self.daily_lock:
+            upcoming = self.next_daily_pools.get(dificulty)
+            if upcoming is not None and upcoming[0] <= dt.date.today():
+                self.daily_pools[dificulty] = self.next_daily_pools.pop(dificulty)
+
+            return self.daily_pools[dificulty]
+
+    def start(self):
+
+        """
+        Carga los conjuntos de todas las dificultades (también los del reto diario de hoy) y lanza
+        el hilo que los renueva.
+
+        Returns:
+            None
+        """
+
+        today = dt.date.today()
+        for dificulty in config.difficulty_bands:
+            self.load(dificulty)
+            self.daily_pools[dificulty] = self.build_daily(dificulty, today)
+        self.thread = threading.Thread(target=self.refresh_loop, name="pool-refresh", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def refresh_loop(self):
+
+        """
+        Renueva los conjuntos de películas cada refresh_interval segundos y prepara los del reto diario
+        de mañana, despertándose también al cambiar de día. Si una renovación falla, se siguen usando
+        las películas anteriores; un reto diario que no se ha podido preparar se vuelve a intentar
+        pasados config.server_daily_retry_interval segundos.
+
+        Returns:
+            None
+        """
+
+        next_refresh = time.monotonic() + self.refresh_interval
+        while not self.stopped.is_set():
+            failed = False
+            for dificulty in config.difficulty_bands:
+                if self.stopped.is_set():
+                    return
+                try:
+                    self.prepare_daily(dificulty)
+                except Exception as e:
+                    failed = True
+                    print(f"No se ha podido preparar el reto diario de la dificultad {dificulty}: {e}")
+
+            # Esperar a la siguiente renovación o al cambio de día, lo que llegue antes
+            now = dt.datetime.now()
+            until_tomorrow = (dt.datetime.combine(now.date() + dt.timedelta(days=1), dt.time()) - now).total_seconds() + 1
+            timeout = min(next_refresh - time.monotonic(), until_tomorrow)
+            if failed:
+                timeout = min(timeout, config.server_daily_retry_interval)
+            if self.stopped.wait(max(timeout, 0)):
+                return
+
+            if time.monotonic() >= next_refresh:
+                next_refresh = time.monotonic() + self.refresh_interval
+                for dificulty in config.difficulty_bands:
+                    if self.stopped.is_set():
+                        return
+                    try:
+                        self.load(dificulty)
+                    except Exception as e:
+                        print(f"No se han podido renovar las películas de la dificultad {dificulty}: {e}")
+
+    def get(self, dificulty):
+
+        """
+        Devuelve el conjunto de películas vigente de una dificultad.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+
+        Returns:
+            tuple: El conjunto de películas (MoviePool) y su índice de películas válidas (EligibilityIndex).
+        """
+
+        return self.pools[dificulty]
+
+
+
+class GameSession:
+
+    """
+    Partida de un jugador: las cuatro preguntas, preparadas al empezar, y las respuestas dadas.
+
+    Args:
+        player (str): El nombre del jugador.
+        dificulty (int): El nivel de dificultad elegido.
+        questions (list): Las preguntas de la partida, en el orden en que se hacen.
+        seed (int): La semilla con la que se han sorteado las preguntas, para repetir la partida.
+        daily (bool): Si la partida es el reto diario.
+    """
+
+    def __init__(self, player, dificulty, questions, seed=None, daily=False):
+        self.id = uuid.uuid4().hex
+        self.player = player
+        self.dificulty = dificulty
+        self.questions = questions
+        self.seed = seed
+        self.daily = daily
+        self.answers = []
+        self.counter = 0
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return len(self.answers) == len(self.questions)
+
+    @property
+    def current(self):
+        return None if self.finished else self.questions[len(self.answers)]
+
+    @property
+    def points(self):
+        return round(self.counter * points_per_question(self.dificulty), 2)
+
+    def answer(self, answer):
+
+        """
+        Registra la respuesta del jugador a la pregunta actual.
+
+        Args:
+            answer (int): La respuesta del jugador (entre 1 y 4).
+
+        Returns:
+            tuple: La pregunta respondida y si la respuesta es correcta.
+        """
+
+        with self.lock:
+            if self.finished:
+                raise ValueError("La partida ya ha terminado.")
+            question = self.current
+            correct = is_answer_correct(question, answer)
+            self.answers.append(answer)
+            self.counter += correct
+            self.updated_at = time.time()
+
+        return question, correct
+
+
+
+class SessionStore:
+
+    """
+    Partidas en curso de todos los jugadores, guardadas en memoria y descartadas tras un tiempo
+    sin actividad.
+
+    Args:
+        registry (PoolRegistry): Los conjuntos de películas compartidos.
+        line_width (int): Un entero que indica la longitud máxima de las filas de caracteres.
+        ttl (float): Segundos de inactividad tras los que se descarta una partida.
+        max_sessions (int): Número máximo de partidas simultáneas.
+    """
+
+    def __init__(self, registry, line_width=80, ttl=config.server_session_ttl, max_sessions=config.server_max_sessions):
+        self.registry = registry
+        self.line_width = line_width
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.overview_texts = {}
+        self.daily = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def purge(self):
+
+        """
+        Descarta las partidas sin actividad desde hace más de ttl segundos.
+
+        Returns:
+            None
+        """
+
+        limit = time.time() - self.ttl
+        with self.lock:
+            for session_id in [session_id for session_id, session in self.sessions.items() if session.updated_at < limit]:
+                del self.sessions[session_id]
+
+    def texts(self, dificulty, movie_pool):
+
+        """
+        Devuelve los resúmenes ya formateados y enmascarados del conjunto de películas vigente de
+        una dificultad, preparándolos de una vez cuando el conjunto se renueva.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+            movie_pool (popcorn.pool.MoviePool): El conjunto de películas vigente.
+
+        Returns:
+            tuple: Los resúmenes formateados y los enmascarados (popcorn.masking.mask_overviews).
+        """
+
+        cached_pool, texts = self.overview_texts.get(dificulty, (None, None))
+        if cached_pool is not movie_pool:
+            texts = mask_overviews(movie_pool.overviews, self.line_width, dificulty)
+            self.overview_texts[dificulty] = (movie_pool, texts)
+
+        return texts
+
+    def build(self, dificulty, movie_pool, eligibility, sampling, overview_texts=None):
+
+        """
+        Sortea las preguntas de una partida, cada tipo con su propio generador.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+            movie_pool (popcorn.pool.MoviePool): El conjunto de películas.
+            eligibility (popcorn.eligibility.EligibilityIndex): Las películas válidas para cada tipo de pregunta.
+            sampling (popcorn.sampling.SamplingEngine): Los sorteos de la partida.
+            overview_texts (tuple): Los resúmenes ya formateados y enmascarados del conjunto. Opcional.
+
+        Returns:
+            list: Las preguntas, en el orden en que se hacen.
+        """
+
+        return [
+            build_question(question_type, movie_pool, eligibility, dificulty, self.line_width, overview_texts, sampling.stream(question_type))
+            for question_type in QUESTION_TYPES
+        ]
+
+    def daily_questions(self, dificulty):
+
+        """
+        Devuelve las preguntas del reto diario de una dificultad, las mismas para todos los jugadores:
+        se sortean una sola vez con la semilla del día sobre el conjunto de películas del reto
+        (PoolRegistry.daily) y se vuelven a sortear cuando cambia el día.
+
+        Args:
+            dificulty (int): El nivel de dificultad.
+
+        Returns:
+            tuple: La semilla del día y las preguntas.
+        """
+
+        date, movie_pool, eligibility = self.registry.daily(dificulty)
+        cached_pool, seed, questions = self.daily.get(dificulty, (None, None, None))
+        if cached_pool is not movie_pool:
+            sampling = SamplingEngine.daily(dificulty, date)
+            seed, questions = sampling.seed, self.build(dificulty, movie_pool, eligibility, sampling)
+            self.daily[dificulty] = (movie_pool, seed, questions)
+
+        return seed, questions
+
+    def create(self, player, dificulty, daily=False, seed=None):
+
+        """
+        Empieza una partida preparando sus preguntas con el conjunto de películas de su dificultad.
+
+        Args:
+            player (str): El nombre del jugador.
+            dificulty (int): El nivel de dificultad elegido.
+            daily (bool): Si la partida es el reto diario (las mismas preguntas para todos ese día).
+            seed (int): La semilla de los sorteos, para repetir una partida. Por defecto, una al azar.
+
+        Returns:
+            GameSession: La partida creada.
+        """
+
+        if daily:
+            seed, questions = self.daily_questions(dificulty)
+        else:
+            movie_pool, eligibility = self.registry.get(dificulty)
+            sampling = SamplingEngine(seed)
+            seed, questions = sampling.seed, self.build(dificulty, movie_pool, eligibility, sampling, self.texts(dificulty, movie_pool))
+        session = GameSession(player, dificulty, list(questions), seed, daily)
+
+        self.purge()
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise OverflowError("Se ha alcanzado el número máximo de partidas simultáneas.")
+            self.sessions[session.id] = session
+
+        return session
+
+    def get(self, session_id):
+
+        """
+        Devuelve una partida en curso.
+
+        Args:
+            session_id (str): El identificador de la partida.
+
+        Returns:
+            GameSession: La partida, o None si no existe o ha caducado.
+        """
+
+        session = self.sessions.get(session_id)
+        if session is None or session.updated_at < time.time() - self.ttl:
+            return None
+        session.updated_at = time.time()
+
+        return session
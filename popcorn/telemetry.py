@@ -0,0 +1,369 @@
+# Instrumentación de las etapas del juego: tiempos, contadores, logs estructurados y métricas de Prometheus
+
+import contextlib
+import datetime as dt
+import io
+import json
+import os
+import threading
+import time
+
+from popcorn import config
+
+# Si la telemetría está desactivada, timer() devuelve siempre este contexto vacío y el coste es despreciable
+NULL_TIMER = contextlib.nullcontext()
+
+enabled = config.telemetry_enabled
+timers = {}
+counters = {}
+gauges = {}
+lock = threading.Lock()
+log_file = None
+
+
+
+def configure(enable=True, log_path=config.telemetry_log):
+
+    """
+    Activa o desactiva la telemetría en tiempo de ejecución.
+
+    Args:
+        enable (bool): Si se activa la telemetría.
+        log_path (str): La ruta del fichero JSON Lines en el que se escribe cada medida. Opcional.
+
+    Returns:
+        None
+    """
+
+    global enabled, log_file
+    with lock:
+        enabled = enable
+        if log_file is not None:
+            log_file.close()
+            log_file = None
+        if enable and log_path:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+            log_file = open(log_path, "a", encoding="utf-8", buffering=1)
+
+
+
+def reset():
+    with lock:
+        timers.clear()
+        counters.clear()
+        gauges.clear()
+
+
+
+def label_key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+
+def log(event, **fields):
+
+    """
+    Escribe un evento en el log estructurado (una línea JSON por evento), si hay uno configurado.
+
+    Args:
+        event (str): El tipo de evento.
+        **fields: Los datos del evento.
+
+    Returns:
+        None
+    """
+
+    if log_file is None:
+        return None
+    line = json.dumps({"time": dt.datetime.now().isoformat(timespec="milliseconds"), "event": event, **fields}, ensure_ascii=False)
+    with lock:
+        if log_file is not None:
+            log_file.write(line + "\n")
+
+
+
+def observe(name, seconds, **labels):
+
+    """
+    Registra la duración de una ejecución de una etapa.
+
+    Args:
+        name (str): El nombre de la etapa (por ejemplo, "export_download").
+        seconds (float): La duración, en segundos.
+        **labels: Etiquetas adicionales de la medida (por ejemplo, el tipo de pregunta).
+
+    Returns:
+        None
+    """
+
+    if not enabled:
+        return None
+    key = label_key(name, labels)
+    with lock:
+        stats = timers.setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+    log("timer", name=name, seconds=round(seconds, 6), **labels)
+
+
+
+def count(name, value=1, **labels):
+
+    """
+    Suma una cantidad a un contador (peticiones HTTP, bytes transferidos, aciertos de caché...).
+
+    Args:
+        name (str): El nombre del contador (por ejemplo, "http_requests").
+        value (int): La cantidad a sumar.
+        **labels: Etiquetas adicionales del contador (por ejemplo, el recurso pedido).
+
+    Returns:
+        None
+    """
+
+    if not enabled:
+        return None
+    key = label_key(name, labels)
+    with lock:
+        counters[key] = counters.get(key, 0) + value
+
+
+
+def gauge(name, value, **labels):
+
+    """
+    Guarda el último valor de una medida puntual (por ejemplo, el pico de memoria de una fase).
+
+    Args:
+        name (str): El nombre de la medida.
+        value (float): El valor.
+        **labels: Etiquetas adicionales de la medida.
+
+    Returns:
+        None
+    """
+
+    if not enabled:
+        return None
+    with lock:
+        gauges[label_key(name, labels)] = value
+
+
+
+class Timer:
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+
+def timer(name, **labels):
+
+    """
+    Mide la duración del bloque de un with como una ejecución de una etapa.
+
+    Args:
+        name (str): El nombre de la etapa.
+        **labels: Etiquetas adicionales de la medida.
+
+    Returns:
+        contextlib.AbstractContextManager: El contexto que mide el bloque (vacío si la telemetría está desactivada).
+    """
+
+    if not enabled:
+        return NULL_TIMER
+
+    return Timer(name, labels)
+
+
+
+class TimedReader(io.RawIOBase):
+
+    """
+    Envoltorio de un fichero (o de una respuesta HTTP) que acumula el tiempo dedicado a leerlo y
+    los bytes leídos, para separar en una lectura en streaming lo que tarda cada capa.
+
+    Args:
+        fileobj (file-like): El fichero original.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        size = self.fileobj.readinto(buffer)
+        self.seconds += time.perf_counter() - start
+        self.bytes += size or 0
+        return size
+
+
+
+def snapshot():
+
+    """
+    Devuelve una copia de todas las medidas acumuladas.
+
+    Returns:
+        dict: Los tiempos ("timers": ejecuciones, segundos totales y máximos), los contadores
+              ("counters") y las medidas puntuales ("gauges") de cada nombre y combinación de etiquetas.
+    """
+
+    with lock:
+        return {
+            "timers": [
+                {"name": name, **dict(labels), "count": stats[0], "seconds": stats[1], "max_seconds": stats[2]}
+                for (name, labels), stats in sorted(timers.items())
+            ],
+            "counters": [
+                {"name": name, **dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "gauges": [
+                {"name": name, **dict(labels), "value": value}
+                for (name, labels), value in sorted(gauges.items())
+            ]
+        }
+
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+
+def prometheus_text():
+
+    """
+    Exporta las medidas acumuladas en el formato de texto de Prometheus: cada etapa como un
+    summary (popcorn_<etapa>_seconds) con su máximo, cada contador como popcorn_<nombre>_total y
+    cada medida puntual como popcorn_<nombre>.
+
+    Returns:
+        str: Las métricas.
+    """
+
+    lines = []
+    with lock:
+        families = {}
+        for (name, labels), stats in sorted(timers.items()):
+            families.setdefault(name, []).append((labels, stats))
+        for name, series in families.items():
+            lines.append(f"# TYPE popcorn_{name}_seconds summary")
+            for labels, (runs, total, _) in series:
+                lines.append(f"popcorn_{name}_seconds_count{format_labels(labels)} {runs}")
+                lines.append(f"popcorn_{name}_seconds_sum{format_labels(labels)} {total:.6f}")
+            lines.append(f"# TYPE popcorn_{name}_seconds_max gauge")
+            for labels, (_, _, maximum) in series:
+                lines.append(f"popcorn_{name}_seconds_max{format_labels(labels)} {maximum:.6f}")
+
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            families.setdefault(name, []).append((labels, value))
+        for name, series in families.items():
+            lines.append(f"# TYPE popcorn_{name}_total counter")
+            for labels, value in series:
+                lines.append(f"popcorn_{name}_total{format_labels(labels)} {value}")
+
+        families = {}
+        for (name, labels), value in sorted(gauges.items()):
+            families.setdefault(name, []).append((labels, value))
+        for name, series in families.items():
+            lines.append(f"# TYPE popcorn_{name} gauge")
+            for labels, value in series:
+                lines.append(f"popcorn_{name}{format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+
+def summary():
+
+    """
+    Resume las medidas acumuladas en una tabla para mostrarla en la terminal.
+
+    Returns:
+        str: Una línea por etapa (ejecuciones, tiempo total y máximo), por contador y por medida puntual.
+    """
+
+    data = snapshot()
+    lines = [f"{'Etapa':<40} {'veces':>6} {'total (s)':>10} {'máx. (s)':>10}"]
+    for stats in data["timers"]:
+        labels = ",".join(f"{key}={value}" for key, value in stats.items() if key not in ("name", "count", "seconds", "max_seconds"))
+        name = f"{stats['name']}[{labels}]" if labels else stats["name"]
+        lines.append(f"{name:<40} {stats['count']:>6} {stats['seconds']:>10.4f} {stats['max_seconds']:>10.4f}")
+    lines.append("")
+    for stats in data["counters"] + data["gauges"]:
+        labels = ",".join(f"{key}={value}" for key, value in stats.items() if key not in ("name", "value"))
+        name = f"{stats['name']}[{labels}]" if labels else stats["name"]
+        lines.append(f"{name:<57} {stats['value']:>10}")
+
+    return "\n".join(lines)
+
+
+
+@contextlib.contextmanager
+def profile(name, directory=config.telemetry_profile_dir):
+
+    """
+    Perfila con cProfile y tracemalloc el bloque de un with (por ejemplo, la preparación de la
+    partida) si se ha configurado una carpeta de perfiles; si no, no hace nada.
+
+    El perfil se guarda en <directory>/<name>-<fecha>.prof (se puede abrir con pstats o snakeviz)
+    y el pico de memoria se registra como una medida más.
+
+    Args:
+        name (str): El nombre de la fase perfilada.
+        directory (str): La carpeta en la que se guardan los perfiles. Opcional.
+
+    Yields:
+        None
+    """
+
+    if not directory:
+        yield None
+        return
+
+    import cProfile
+    import tracemalloc
+
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler.enable()
+    try:
+        yield None
+    finally:
+        profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        path = os.path.join(directory, f"{name}-{dt.datetime.now():%Y%m%d-%H%M%S}.prof")
+        profiler.dump_stats(path)
+        gauge("profile_peak_memory_bytes", peak, phase=name)
+        log("profile", phase=name, path=path, peak_memory_bytes=peak)
+
+
+
+# Abrir el log estructurado si la telemetría se ha activado desde las variables de entorno
+if enabled:
+    configure(True)
@@ -0,0 +1,244 @@
+# Cliente concurrente de la API de TMDb
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from popcorn import config, telemetry
+from popcorn.export import loads
+from popcorn.records import project_movie
+
+# Códigos de estado ante los que merece la pena reintentar la petición
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+
+class TokenBucket:
+
+    """
+    Limitador de peticiones por segundo compartido entre hilos (algoritmo token bucket).
+
+    Args:
+        rate (float): Número de tokens que se reponen por segundo.
+        capacity (int): Número máximo de tokens acumulables (tamaño de ráfaga).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+
+        """
+        Consume un token, esperando lo necesario hasta que haya uno disponible.
+
+        Returns:
+            None
+        """
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return None
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+
+class TMDbClient:
+
+    """
+    Cliente de la API de TMDb que reutiliza un único pool de conexiones keep-alive y permite
+    descargar en paralelo los detalles de un lote de películas.
+
+    Los detalles se reducen a registros compactos (popcorn.records) con el título y el resumen de
+    todos los idiomas configurados, que se obtienen en una sola petición por película.
+
+    Args:
+        api_key (str): El token de lectura de la API de TMDb.
+        language (str): El idioma principal en el que se piden los detalles de las películas.
+        languages (list): Otros idiomas cuyo título y resumen se guardan en cada registro. Por
+                          defecto, los de la configuración.
+        concurrency (int): Número máximo de peticiones simultáneas.
+        rate_limit (float): Número máximo de peticiones por segundo.
+        timeout (tuple): Timeouts de conexión y lectura de cada petición, en segundos.
+        max_retries (int): Número de reintentos ante errores 429/5xx o de red.
+        backoff (float): Espera base (en segundos) del backoff exponencial entre reintentos.
+        cache (popcorn.cache.DetailsCache): Caché persistente de detalles que se consulta antes de
+                                            llamar a la API. Opcional.
+    """
+
+    def __init__(self, api_key, language="es", languages=None, concurrency=config.tmdb_concurrency,
+                 rate_limit=config.tmdb_rate_limit, timeout=config.tmdb_timeout,
+                 max_retries=config.tmdb_max_retries, backoff=config.tmdb_backoff, cache=None):
+        self.language = language
+        self.languages = list(dict.fromkeys([language, *(config.tmdb_languages if languages is None else languages)]))
+        self.cache = cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(rate_limit)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tmdb")
+
+        # Una única sesión con tantas conexiones persistentes como peticiones simultáneas
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "accept": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+
+        """
+        Cierra el pool de hilos y las conexiones abiertas del cliente.
+
+        Returns:
+            None
+        """
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def request(self, path, params=None):
+
+        """
+        Hace una petición GET a la API respetando el límite de peticiones, con timeout y
+        reintentos con backoff exponencial ante errores 429/5xx o de red.
+
+        Args:
+            path (str): La ruta del recurso dentro de la API (por ejemplo, "/movie/550").
+            params (dict): Parámetros adicionales de la petición.
+
+        Returns:
+            dict: La respuesta de la API decodificada desde JSON (con orjson si está instalado).
+        """
+
+        url = f"{config.tmdb_api_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with telemetry.timer("tmdb_request"):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                telemetry.count("http_requests", resource="movie", status="network_error")
+                if attempt == self.max_retries:
+                    raise
+                retry_after = None
+            else:
+                telemetry.count("http_requests", resource="movie", status=response.status_code)
+                telemetry.count("http_bytes", len(response.content), resource="movie")
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return loads(response.content)
+                retry_after = response.headers.get("Retry-After")
+
+            # Esperar lo que indique la API o, si no lo indica, un backoff exponencial con jitter
+            if retry_after is not None and retry_after.isdigit():
+                wait = float(retry_after)
+            else:
+                wait = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            time.sleep(wait)
+
+    def get_movie(self, movie_id):
+
+        """
+        Obtiene el registro compacto de una película, desde la caché si está disponible.
+
+        Args:
+            movie_id (int): El ID de la película en TMDb.
+
+        Returns:
+            dict: El registro compacto de la película (ver popcorn.records.project_movie).
+        """
+
+        if self.cache is not None:
+            cached = self.cache.get_many([movie_id], self.languages)
+            if cached:
+                return cached[int(movie_id)]
+
+        movie = self.fetch_movie(movie_id)
+        if self.cache is not None:
+            self.cache.put_many([movie])
+
+        return movie
+
+    def fetch_movie(self, movie_id):
+
+        """
+        Descarga de la API los detalles de una película, sin pasar por la caché, y los reduce a
+        un registro compacto. Si hay más de un idioma, las traducciones se piden en la misma
+        petición (append_to_response=translations) en lugar de hacer una petición por idioma.
+
+        Args:
+            movie_id (int): El ID de la película en TMDb.
+
+        Returns:
+            dict: El registro compacto de la película (ver popcorn.records.project_movie).
+        """
+
+        params = {"language": self.language}
+        if len(self.languages) > 1:
+            params["append_to_response"] = "translations"
+
+        return project_movie(self.request(f"/movie/{movie_id}", params=params), self.language, self.languages)
+
+    def get_movies(self, movie_ids):
+
+        """
+        Obtiene en paralelo los registros compactos de un lote de películas.
+
+        Si el cliente tiene caché, sólo se descargan las películas que no estén en ella (o hayan
+        caducado), y las descargadas se guardan para las siguientes partidas. Las películas cuya
+        descarga falla después de todos los reintentos se descartan avisando por pantalla, para que
+        un único error no impida preparar el juego.
+
+        Args:
+            movie_ids (iterable): Los IDs de las películas en TMDb.
+
+        Returns:
+            list: Los registros de cada película descargada, en el mismo orden que los IDs.
+        """
+
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        cached = self.cache.get_many(movie_ids, self.languages) if self.cache is not None else {}
+
+        # Descargar en paralelo sólo las películas que no estaban en la caché
+        missing_ids = [movie_id for movie_id in dict.fromkeys(movie_ids) if movie_id not in cached]
+        futures = [self.executor.submit(self.fetch_movie, movie_id) for movie_id in missing_ids]
+        fetched = {}
+        for movie_id, future in zip(missing_ids, futures):
+            try:
+                fetched[movie_id] = future.result()
+            except requests.RequestException as e:
+                print(f"No se han podido obtener los detalles de la película {movie_id}: {e}")
+        if self.cache is not None and fetched:
+            self.cache.put_many(list(fetched.values()))
+
+        movies = []
+        for movie_id in movie_ids:
+            movie = cached.get(movie_id) or fetched.get(movie_id)
+            if movie is not None:
+                movies.append(movie)
+
+        return movies